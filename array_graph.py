@@ -0,0 +1,198 @@
+import numpy as np
+from typing import List, Tuple
+from board import count_neighbour_mines
+from graph import Graph, Value
+from grid import MSGrid
+
+
+class ArrayGraph:
+    """Array backed alternative to graph.Graph for large frontiers.
+
+    Unknown cells get integer ids 0..U-1 and every known cell (or derived info node) is a constraint row:
+    a fixed width (max 8 neighbours) row of unknown ids padded with -1, a value and a degree.
+    Edge checks are a lookup in a row of at most 8 entries, and the unknown to constraint adjacency is kept
+    in CSR form. resolve and solve_step give the same deductions as Graph, as locations instead of nodes.
+    """
+    MAX_NEIGHBOURS = 8
+    NO_NEIGHBOUR = -1
+
+    def __init__(self, unknown_locations: np.ndarray, members: np.ndarray, values: np.ndarray) -> None:
+        """
+        Args:
+            unknown_locations (np.ndarray): (U, 2) array, the location of each unknown id
+            members (np.ndarray): (C, 8) array, the unknown ids of each constraint padded with -1
+            values (np.ndarray): (C,) array, the number of mines among the members of each constraint
+        """
+        self.unknown_locations = np.asarray(unknown_locations, dtype=np.int32).reshape(-1, 2)
+        self.members = ArrayGraph.canonical_rows(np.asarray(members, dtype=np.int32).reshape(-1, ArrayGraph.MAX_NEIGHBOURS))
+        self.values = np.asarray(values, dtype=np.int16)
+        self.degrees = (self.members != ArrayGraph.NO_NEIGHBOUR).sum(axis=1).astype(np.int8)
+        self.scopes = set(row.tobytes() for row in self.members)
+        self.build_incidence()
+
+    @property
+    def num_unknowns(self) -> int:
+        return len(self.unknown_locations)
+
+    @property
+    def num_constraints(self) -> int:
+        return len(self.members)
+
+    @staticmethod
+    def canonical_rows(members: np.ndarray) -> np.ndarray:
+        """sorts the ids of every row with the padding at the end, so that equal scopes have equal rows"""
+        padded = np.where(members == ArrayGraph.NO_NEIGHBOUR, np.iinfo(np.int32).max, members)
+        padded.sort(axis=1)
+        return np.where(padded == np.iinfo(np.int32).max, ArrayGraph.NO_NEIGHBOUR, padded).astype(np.int32)
+
+    @classmethod
+    def from_grid(cls, grid: MSGrid) -> 'ArrayGraph':
+        """builds the constraints of the whole frontier of a grid with array shifts, flagged cells are
+        left out and subtracted from the values of their neighbours.
+        """
+        unknown = grid.grid == grid.unknown_constant
+        flagged = grid.grid == MSGrid.MINE
+        known = grid.grid >= 0
+        ids = np.full(grid.grid.shape, ArrayGraph.NO_NEIGHBOUR, dtype=np.int32)
+        ids[unknown] = np.arange(np.count_nonzero(unknown), dtype=np.int32)
+        padded_ids = np.pad(ids, 1, constant_values=ArrayGraph.NO_NEIGHBOUR)
+        neighbour_ids = []
+        for dx in (0, 1, 2):
+            for dy in (0, 1, 2):
+                if (dx, dy) != (1, 1):
+                    neighbour_ids.append(padded_ids[dx:dx + grid.size_x, dy:dy + grid.size_y])
+        flag_counts = count_neighbour_mines(flagged)
+        neighbour_ids = np.stack(neighbour_ids, axis=-1)
+        is_constraint = known & (neighbour_ids != ArrayGraph.NO_NEIGHBOUR).any(axis=-1)
+        members = neighbour_ids[is_constraint]
+        values = grid.grid[is_constraint].astype(np.int16) - flag_counts[is_constraint]
+
+        # only keep the unknown cells that are next to a constraint and renumber them
+        used = np.unique(members[members != ArrayGraph.NO_NEIGHBOUR])
+        renumber = np.full(len(np.flatnonzero(unknown)) + 1, ArrayGraph.NO_NEIGHBOUR, dtype=np.int32)
+        renumber[used] = np.arange(len(used), dtype=np.int32)
+        members = renumber[members]  # -1 indexes the last entry, which stays -1
+        unknown_locations = np.argwhere(unknown)[used]
+        return cls(unknown_locations, members, values)
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'ArrayGraph':
+        """converts a Graph (e.g. one component of a GraphSolver), info nodes become constraints as well"""
+        unknown_ids = {}
+        unknown_locations = []
+        for vtx in graph.vertexes:
+            if vtx.value == Value.Unknown:
+                unknown_ids[vtx] = len(unknown_locations)
+                unknown_locations.append(vtx.location)
+        members = []
+        values = []
+        for vtx in graph.vertexes:
+            if vtx.value != Value.Unknown and vtx.degree > 0:
+                row = [unknown_ids[neighbour] for neighbour in vtx.neighbours]
+                members.append(row + [ArrayGraph.NO_NEIGHBOUR] * (ArrayGraph.MAX_NEIGHBOURS - len(row)))
+                values.append(vtx.value)
+        return cls(np.array(unknown_locations, dtype=np.int32), np.array(members, dtype=np.int32), np.array(values))
+
+    def build_incidence(self) -> None:
+        """CSR adjacency from unknown ids to the constraints they are a member of"""
+        constraint_ids, slots = np.nonzero(self.members != ArrayGraph.NO_NEIGHBOUR)
+        unknown_ids = self.members[constraint_ids, slots]
+        order = np.argsort(unknown_ids, kind='stable')
+        self.incidence_indices = constraint_ids[order].astype(np.int32)
+        self.incidence_indptr = np.zeros(self.num_unknowns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(unknown_ids, minlength=self.num_unknowns), out=self.incidence_indptr[1:])
+
+    def has_edge(self, constraint_id: int, unknown_id: int) -> bool:
+        return bool((self.members[constraint_id] == unknown_id).any())
+
+    def constraints_of(self, unknown_id: int) -> np.ndarray:
+        return self.incidence_indices[self.incidence_indptr[unknown_id]:self.incidence_indptr[unknown_id + 1]]
+
+    def overlapping_pairs(self, constraint_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """pairs of (given constraint, other constraint) sharing at least one unknown
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: the given constraints, the other constraints and the
+            number of unknowns they share
+        """
+        if len(constraint_ids) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        rows = self.members[constraint_ids]
+        sources = np.repeat(constraint_ids, (rows != ArrayGraph.NO_NEIGHBOUR).sum(axis=1))
+        unknown_ids = rows[rows != ArrayGraph.NO_NEIGHBOUR]
+        starts = self.incidence_indptr[unknown_ids]
+        counts = self.incidence_indptr[unknown_ids + 1] - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        others = self.incidence_indices[np.repeat(starts, counts) + offsets]
+        sources = np.repeat(sources, counts)
+        keep = sources != others
+        keys = sources[keep].astype(np.int64) * self.num_constraints + others[keep]
+        keys, shared = np.unique(keys, return_counts=True)
+        return keys // self.num_constraints, keys % self.num_constraints, shared
+
+    def add_new_info_constraints(self, constraint_ids: np.ndarray) -> np.ndarray:
+        """the array version of Graph.add_new_info_nodes, for every pair where the members of one constraint
+        are a subset of the other's, the difference is added as a new constraint unless its scope exists already.
+
+        Returns:
+            np.ndarray: the ids of the new constraints
+        """
+        sources, others, shared = self.overlapping_pairs(constraint_ids)
+        other_is_subset = (shared == self.degrees[others]) & (self.degrees[sources] > shared)
+        source_is_subset = (shared == self.degrees[sources]) & (self.degrees[others] > shared)
+        supersets = np.concatenate([sources[other_is_subset], others[source_is_subset]])
+        subsets = np.concatenate([others[other_is_subset], sources[source_is_subset]])
+        if len(supersets) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = self.members[supersets]
+        in_subset = (rows[:, :, None] == self.members[subsets][:, None, :]).any(axis=2)
+        rows = ArrayGraph.canonical_rows(np.where(in_subset, ArrayGraph.NO_NEIGHBOUR, rows))
+        values = self.values[supersets] - self.values[subsets]
+        new_rows = []
+        new_values = []
+        for row, value in zip(rows, values):
+            scope = row.tobytes()
+            if scope not in self.scopes:
+                self.scopes.add(scope)
+                new_rows.append(row)
+                new_values.append(value)
+        if not new_rows:
+            return np.zeros(0, dtype=np.int64)
+        first_new = self.num_constraints
+        self.members = np.concatenate([self.members, np.array(new_rows, dtype=np.int32)])
+        self.values = np.concatenate([self.values, np.array(new_values, dtype=np.int16)])
+        self.degrees = (self.members != ArrayGraph.NO_NEIGHBOUR).sum(axis=1).astype(np.int8)
+        self.build_incidence()
+        return np.arange(first_new, self.num_constraints)
+
+    def update_graph(self) -> None:
+        """derives new constraints until a fixed point, only the constraints added in the previous round
+        are paired with the others.
+        """
+        new_constraints = np.arange(self.num_constraints)
+        while len(new_constraints):
+            new_constraints = self.add_new_info_constraints(new_constraints)
+
+    def resolve(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Returns:
+            Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]: the locations to flag and the locations to clear.
+        """
+        to_flag = np.unique(self.members[self.values == self.degrees])
+        to_clear = np.unique(self.members[self.values == 0])
+        to_flag = to_flag[to_flag != ArrayGraph.NO_NEIGHBOUR]
+        to_clear = to_clear[to_clear != ArrayGraph.NO_NEIGHBOUR]
+        return (
+            [tuple(location) for location in self.unknown_locations[to_flag].tolist()],
+            [tuple(location) for location in self.unknown_locations[to_clear].tolist()],
+        )
+
+    def solve_step(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Returns the locations to clear and the locations to flag, like Graph.solve_step.
+        """
+        self.update_graph()
+        to_flag, to_clear = self.resolve()
+        return to_clear, to_flag
@@ -0,0 +1,534 @@
+"""Benchmarks for the hot paths of the solver.
+
+usage: python benchmark.py [--bench suite boundary game] [--sizes 16x30 100x100 480x480] [--repeat 3]
+       python benchmark.py --bench suite --json results.json [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from board import count_neighbour_mines, generate_board, generate_boards, parse_size
+from engine import GameEngine, STATE_DEFAULT
+from array_graph import ArrayGraph
+from csp_solver import CSPSolver
+from graph_solver import GraphSolver
+from linear_solver import LinearSolver
+from grid import MSGrid
+import solver
+
+
+def make_board(size_x: int, size_y: int, mine_density: float = 0.2, revealed: float = 0.3, seed: int = 0) -> np.ndarray:
+    """plays random safe clicks on a seeded game until the given fraction of the safe cells is revealed.
+
+    Returns:
+        np.ndarray: the agent view of the board, using the MSGrid constants
+    """
+    engine = GameEngine(size_x, size_y, int(size_x * size_y * mine_density), seed=seed)
+    safe_cells = np.argwhere(~engine.mines)
+    engine.rng.shuffle(safe_cells)
+    target = revealed * len(safe_cells)
+    for x, y in safe_cells:
+        if engine.clicked_count >= target:
+            break
+        engine.reveal(x, y)
+    return engine.revealed.copy()
+
+
+def time_it(function: Callable, repeat: int) -> float:
+    """best wall time of a number of calls, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(function: Callable) -> Tuple[object, int]:
+    """result and peak traced memory of a single call, in bytes"""
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+# seeded boards of the suite: name -> (size_x, size_y, number of mines)
+PRESETS = {
+    'beginner': (9, 9, 10),
+    'intermediate': (16, 16, 40),
+    'expert': (16, 30, 99),
+    'large': (100, 100, 1600),
+    'very_large': (480, 480, 36864),
+}
+
+
+def measure(function: Callable, repeat: int, setup: Callable = None, budget: float = 5.0) -> Dict:
+    """peak memory of one traced call, then the best wall time of up to `repeat` untraced calls, stopping
+    early once they took more than `budget` seconds in total. setup is called (untimed) before every call
+    and its result is passed to the function.
+
+    Returns:
+        Dict: time_ms and peak_kb, or the error the function raised
+    """
+    setup = setup or (lambda: None)
+    try:
+        argument = setup()
+        tracemalloc.start()
+        try:
+            function(argument)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        best = float('inf')
+        spent = 0.0
+        for _ in range(repeat):
+            argument = setup()
+            start = time.perf_counter()
+            function(argument)
+            elapsed = time.perf_counter() - start
+            best = min(best, elapsed)
+            spent += elapsed
+            if spent > budget:
+                break
+    except RecursionError as error:
+        return {'error': '{}: {}'.format(type(error).__name__, error)}
+    return {'time_ms': best * 1e3, 'peak_kb': peak / 1024}
+
+
+def bench_suite(presets: List[str], repeat: int, seed: int) -> List[Dict]:
+    """times the hot paths of the grid, the graphs and the rule solver on one seeded board per preset"""
+    results = []
+    print('{:>12} {:>28} {:>12} {:>12}'.format('preset', 'operation', 'time (ms)', 'peak (KB)'))
+    for preset in presets:
+        size_x, size_y, num_of_mines = PRESETS[preset]
+        board = make_board(size_x, size_y, mine_density=num_of_mines / (size_x * size_y), seed=seed)
+        grid = MSGrid(grid=board)
+
+        def update_graphs(solver):
+            for graph in solver.graphs:
+                graph.update_graph()
+
+        operations = [
+            ('mark_boundary_flags', lambda _: grid.mark_boundary_flags(), None),
+            ('get_connected_unknown_cells', lambda _: grid.get_connected_unknown_cells(), None),
+            ('initiate_graphs', lambda solver: solver.initiate_graphs(grid), lambda: GraphSolver(grid)),
+            # update_graph runs to a fixed point, so every call needs graphs that were not propagated yet
+            ('update_graph', update_graphs, lambda: GraphSolver(grid)),
+            ('relax', lambda _: solver.relax(board), None),
+        ]
+        for name, function, setup in operations:
+            result = {'preset': preset, 'size': [size_x, size_y], 'mines': num_of_mines, 'operation': name}
+            result.update(measure(function, repeat, setup))
+            results.append(result)
+            if 'error' in result:
+                print('{:>12} {:>28} {:>25}'.format(preset, name, result['error'][:25]))
+            else:
+                print('{:>12} {:>28} {:>12.3f} {:>12.0f}'.format(preset, name, result['time_ms'], result['peak_kb']))
+    return results
+
+
+def environment(seed: int, repeat: int) -> Dict:
+    """what the results depend on besides the code, stored next to them"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    """prints the ratio of every time and peak memory to the one of a previous --json output"""
+    with open(baseline_path) as file:
+        baseline = {(result['preset'], result['operation']): result for result in json.load(file)['results']}
+    print('{:>12} {:>28} {:>12} {:>12}'.format('preset', 'operation', 'time ratio', 'peak ratio'))
+    for result in results:
+        old = baseline.get((result['preset'], result['operation']))
+        if old is None or 'error' in old or 'error' in result:
+            continue
+        print('{:>12} {:>28} {:>11.2f}x {:>11.2f}x'.format(
+            result['preset'], result['operation'], result['time_ms'] / max(old['time_ms'], 1e-9),
+            result['peak_kb'] / max(old['peak_kb'], 1e-9)))
+
+
+def boundary_flags_loop(grid: np.ndarray) -> np.ndarray:
+    """the original cell by cell implementation of MSGrid.mark_boundary_flags, kept as a reference"""
+    size_x, size_y = grid.shape
+    boundary_flags = np.zeros((size_x, size_y))
+    neighbour_offsets = [
+        (1, 0), (-1, 1), (0, 1), (1, 1)
+    ]
+    for i in range(size_x):
+        for j in range(size_y):
+            for neighbour_offset in neighbour_offsets:
+                neighbour_index = (i + neighbour_offset[0], j + neighbour_offset[1])
+                if -1 < neighbour_index[0] < size_x and -1 < neighbour_index[1] < size_y:
+                    if (grid[i, j] == MSGrid.UKNOWN_CONSTANT) != (grid[neighbour_index] == MSGrid.UKNOWN_CONSTANT):
+                        boundary_flags[i, j] = 1
+                        boundary_flags[neighbour_index] = 1
+    return boundary_flags
+
+
+def bench_boundary_flags(sizes: List[Tuple[int, int]], repeat: int) -> None:
+    print('{:>10} {:>12} {:>12} {:>9}'.format('size', 'loop (ms)', 'numpy (ms)', 'speedup'))
+    for size_x, size_y in sizes:
+        board = make_board(size_x, size_y)
+        grid = MSGrid(grid=board)
+        assert np.array_equal(grid.boundary_flags, boundary_flags_loop(board)), \
+            'vectorized boundary flags differ from the loop for {}x{}'.format(size_x, size_y)
+        loop_time = time_it(lambda: boundary_flags_loop(board), repeat)
+        numpy_time = time_it(grid.mark_boundary_flags, repeat)
+        print('{:>10} {:>12.3f} {:>12.3f} {:>8.1f}x'.format(
+            '{}x{}'.format(size_x, size_y), loop_time * 1e3, numpy_time * 1e3, loop_time / numpy_time))
+
+
+def check_neighborhood(field, x, y):
+    """the original scan of the neighbours of a cell from solver.py, only relax_loop still uses it"""
+    left = x-1 if x > 0 else None
+    right = x + 1 if x < field.shape[0] - 1 else None
+    down = y + 1 if y < field.shape[1] - 1 else None
+    up = y - 1 if y > 0 else None
+    mines = 0
+    unsolved = False
+    unknown_neighbors= []
+    total = 0
+    for xx in [left, x, right]:
+        if xx is None:
+            continue
+        for yy in [up, y, down]:
+            if yy is None:
+                continue
+            total += 1
+            if field[xx, yy] == MSGrid.MINE:
+                mines += 1
+            if field[xx, yy] == MSGrid.UKNOWN_CONSTANT:
+                unsolved = True
+                unknown_neighbors.append((xx, yy))
+    return mines, unsolved, unknown_neighbors, total
+
+
+def relax_loop(field: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """the original cell by cell implementation of solver.relax (with its bounds fixed), kept as a reference"""
+    to_clear = np.zeros(field.shape, dtype=bool)
+    to_flag = np.zeros(field.shape, dtype=bool)
+    for i in range(field.shape[0]):
+        for j in range(field.shape[1]):
+            if field[i, j] >= 0:
+                mines, unsolved, unknown_neighbours, _ = check_neighborhood(field, i, j)
+                if not unsolved:
+                    continue
+                for cell in unknown_neighbours:
+                    if mines == field[i, j]:
+                        to_clear[cell] = True
+                    if len(unknown_neighbours) == field[i, j] - mines:
+                        to_flag[cell] = True
+    return to_clear, to_flag
+
+
+def bench_relax(sizes: List[Tuple[int, int]], repeat: int) -> None:
+    """the single cell rules of solver.relax against the loop, and against the full GraphSolver which should
+    find at least the same moves
+    """
+    print('{:>10} {:>12} {:>12} {:>9} {:>12} {:>11}'.format(
+        'size', 'loop (ms)', 'numpy (ms)', 'speedup', 'graph (ms)', 'deductions'))
+    for size_x, size_y in sizes:
+        field = make_board(size_x, size_y)
+        _, to_clear, to_flag = solver.relax(field)
+        loop_clear, loop_flag = relax_loop(field)
+        assert np.array_equal(to_clear, loop_clear) and np.array_equal(to_flag, loop_flag), \
+            'vectorized relax differs from the loop for {}x{}'.format(size_x, size_y)
+        start = time.perf_counter()
+        graph_clear, graph_flag = GraphSolver(MSGrid(grid=field)).solve()
+        graph_time = time.perf_counter() - start
+        assert set(map(tuple, np.argwhere(to_clear).tolist())) <= set(graph_clear) and \
+            set(map(tuple, np.argwhere(to_flag).tolist())) <= set(graph_flag), \
+            'relax found moves the graph solver did not for {}x{}'.format(size_x, size_y)
+        loop_time = time_it(lambda: relax_loop(field), repeat)
+        numpy_time = time_it(lambda: solver.relax(field), repeat)
+        print('{:>10} {:>12.3f} {:>12.3f} {:>8.1f}x {:>12.1f} {:>11}'.format(
+            '{}x{}'.format(size_x, size_y), loop_time * 1e3, numpy_time * 1e3, loop_time / numpy_time,
+            graph_time * 1e3, int(to_clear.sum() + to_flag.sum())))
+
+
+def bench_batch(sizes: List[Tuple[int, int]], boards: int, repeat: int) -> None:
+    """solver.relax_batch on a stack of seeded boards against relax and MSGrid run on each board in turn"""
+    print('{:>10} {:>7} {:>16} {:>12} {:>9} {:>13}'.format(
+        'size', 'boards', 'per board (ms)', 'batch (ms)', 'speedup', 'boards/sec'))
+    for size_x, size_y in sizes:
+        stack = np.stack([make_board(size_x, size_y, seed=seed) for seed in range(boards)])
+
+        def one_by_one():
+            return [solver.relax(board)[1:] + (MSGrid(grid=board).boundary_flags.astype(bool),) for board in stack]
+
+        to_clear, to_flag, boundary = solver.relax_batch(stack)
+        for i, (board_clear, board_flag, board_boundary) in enumerate(one_by_one()):
+            assert np.array_equal(to_clear[i], board_clear) and np.array_equal(to_flag[i], board_flag) and \
+                np.array_equal(boundary[i], board_boundary), \
+                'batch masks differ from the single board ones for {}x{}'.format(size_x, size_y)
+        single_time = time_it(one_by_one, repeat)
+        batch_time = time_it(lambda: solver.relax_batch(stack), repeat)
+        print('{:>10} {:>7} {:>16.1f} {:>12.1f} {:>8.1f}x {:>13.0f}'.format(
+            '{}x{}'.format(size_x, size_y), boards, single_time * 1e3, batch_time * 1e3, single_time / batch_time,
+            boards / batch_time))
+
+
+def bench_reveal(sizes: List[Tuple[int, int]], repeat: int, mine_density: float = 0.05) -> None:
+    """clicks the largest zero region of a sparse board, with the precomputed opening and with the
+    cascade the engine falls back to, and the cost of labelling the regions when a board is generated
+    """
+    print('{:>10} {:>9} {:>14} {:>15} {:>9} {:>14}'.format(
+        'size', 'opened', 'cascade (ms)', 'regions (ms)', 'speedup', 'labels (ms)'))
+    for size_x, size_y in sizes:
+        engine = GameEngine(size_x, size_y, int(size_x * size_y * mine_density), seed=0)
+        if not engine.zero_labels.any():
+            continue
+        label = np.argmax(np.bincount(engine.zero_labels.ravel())[1:]) + 1
+        x, y = np.argwhere(engine.zero_labels == label)[0]
+
+        def click(fill):
+            engine.state[:, :] = STATE_DEFAULT
+            engine.clicked_count = 0
+            return fill()
+
+        opened = click(lambda: engine.reveal(x, y))
+        assert sorted(opened) == sorted(click(lambda: engine._flood_fill(x, y))), \
+            'region opening differs from the cascade for {}x{}'.format(size_x, size_y)
+        cascade_time = time_it(lambda: click(lambda: engine._flood_fill(x, y)), repeat)
+        region_time = time_it(lambda: click(lambda: engine.reveal(x, y)), repeat)
+        print('{:>10} {:>9} {:>14.2f} {:>15.2f} {:>8.1f}x {:>14.2f}'.format(
+            '{}x{}'.format(size_x, size_y), len(opened), cascade_time * 1e3, region_time * 1e3,
+            cascade_time / region_time, time_it(engine.label_openings, repeat) * 1e3))
+
+
+def bench_generation(sizes: List[Tuple[int, int]], boards: int, repeat: int, mine_density: float) -> None:
+    """board generation one board at a time against generate_boards, with an opening on the first click"""
+    print('{:>10} {:>7} {:>16} {:>12} {:>9} {:>13}'.format(
+        'size', 'boards', 'one by one (ms)', 'batch (ms)', 'speedup', 'boards/sec'))
+    for size_x, size_y in sizes:
+        num_of_mines = int(size_x * size_y * mine_density)
+        first_click = (size_x // 2, size_y // 2)
+        mines, counts = generate_boards(boards, size_x, size_y, num_of_mines, seed=0, first_click=first_click, opening=True)
+        assert (mines.sum(axis=(1, 2)) == num_of_mines).all() and (counts[:, first_click[0], first_click[1]] == 0).all() \
+            and np.array_equal(counts[0], count_neighbour_mines(mines[0])), \
+            'generated boards are wrong for {}x{}'.format(size_x, size_y)
+        rng = np.random.default_rng(0)
+        single_time = time_it(lambda: [generate_board(size_x, size_y, num_of_mines, rng, first_click, True)
+                                       for _ in range(boards)], repeat)
+        batch_time = time_it(lambda: generate_boards(boards, size_x, size_y, num_of_mines, rng, first_click, True), repeat)
+        print('{:>10} {:>7} {:>16.1f} {:>12.1f} {:>8.1f}x {:>13.0f}'.format(
+            '{}x{}'.format(size_x, size_y), boards, single_time * 1e3, batch_time * 1e3, single_time / batch_time,
+            boards / batch_time))
+
+
+def bench_full_game(sizes: List[Tuple[int, int]], mine_density: float, games: int) -> None:
+    """plays whole games, solving every move both with a persistent GraphSolver that is updated with the
+    changed cells and with a GraphSolver rebuilt from the grid. The first certain move of a solve is applied
+    and a random unknown cell is clicked when there are none.
+    """
+    print('{:>10} {:>7} {:>14} {:>16} {:>9}'.format('size', 'moves', 'rebuild (ms)', 'persistent (ms)', 'speedup'))
+    for size_x, size_y in sizes:
+        rebuild_time = persistent_time = 0.0
+        moves = 0
+        for seed in range(games):
+            engine = GameEngine(size_x, size_y, int(size_x * size_y * mine_density), seed=seed)
+            grid = MSGrid(size_x=size_x, size_y=size_y)
+            solver = GraphSolver(grid)
+            changed = []
+            while not engine.game_over:
+                start = time.perf_counter()
+                solver.update(grid.update_cells((cell, engine.revealed[cell]) for cell in changed))
+                to_clear, to_flag = solver.solve()
+                persistent_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                rebuilt_clear, rebuilt_flag = GraphSolver(MSGrid(grid=engine.revealed.copy())).solve()
+                rebuild_time += time.perf_counter() - start
+                assert set(rebuilt_clear) == set(to_clear) and set(rebuilt_flag) == set(to_flag), \
+                    'persistent solver disagrees with the rebuilt one'
+
+                # one move per solve, like the auto solver of the UI
+                if to_clear:
+                    changed = engine.reveal(*to_clear[0])
+                elif to_flag:
+                    changed = engine.flag(*to_flag[0])
+                else:
+                    unknown_cells = np.argwhere(engine.state == STATE_DEFAULT)
+                    x, y = unknown_cells[engine.rng.integers(len(unknown_cells))]
+                    changed = engine.reveal(x, y)
+                moves += 1
+        print('{:>10} {:>7} {:>14.1f} {:>16.1f} {:>8.1f}x'.format(
+            '{}x{}'.format(size_x, size_y), moves, rebuild_time * 1e3, persistent_time * 1e3,
+            rebuild_time / persistent_time))
+
+
+def bench_parallel(sizes: List[Tuple[int, int]], workers: int, mine_density: float) -> None:
+    """solves a half revealed board with the csp backend in this process and with a process pool of workers,
+    the moves must be the same. The component timings are the ones of the pool run.
+    """
+    print('{:>10} {:>11} {:>12} {:>12} {:>9} {:>16} {:>16}'.format(
+        'size', 'components', 'inline (ms)', 'pool (ms)', 'speedup', 'p50 comp. (ms)', 'max comp. (ms)'))
+    for size_x, size_y in sizes:
+        board = make_board(size_x, size_y, mine_density=mine_density, revealed=0.5)
+        times = []
+        results = []
+        for pool_size in (0, workers):
+            with GraphSolver(MSGrid(grid=board.copy()), backend='csp', time_budget=60, workers=pool_size) as solver:
+                start = time.perf_counter()
+                results.append(solver.solve())
+                times.append(time.perf_counter() - start)
+        assert results[0] == results[1], 'the pool solved {}x{} differently'.format(size_x, size_y)
+        timings = np.array(list(solver.timings.values())) * 1e3
+        print('{:>10} {:>11} {:>12.1f} {:>12.1f} {:>8.1f}x {:>16.2f} {:>16.1f}'.format(
+            '{}x{}'.format(size_x, size_y), len(timings), times[0] * 1e3, times[1] * 1e3, times[0] / times[1],
+            np.median(timings), timings.max()))
+
+
+def bench_array_graph(sizes: List[Tuple[int, int]], repeat: int) -> None:
+    """builds and solves the whole frontier of a board with the Graph based GraphSolver and with an ArrayGraph"""
+    print('{:>10} {:>11} {:>11} {:>11} {:>11} {:>11}'.format(
+        'size', 'graph (ms)', 'array (ms)', 'graph (KB)', 'array (KB)', 'deductions'))
+    for size_x, size_y in sizes:
+        grid = MSGrid(grid=make_board(size_x, size_y))
+        solve_graph = lambda: GraphSolver(grid).solve()
+        solve_array = lambda: ArrayGraph.from_grid(grid).solve_step()
+        (graph_clear, graph_flag), graph_memory = peak_memory(solve_graph)
+        (array_clear, array_flag), array_memory = peak_memory(solve_array)
+        assert set(graph_clear) == set(array_clear) and set(graph_flag) == set(array_flag), \
+            'ArrayGraph deductions differ from the Graph ones for {}x{}'.format(size_x, size_y)
+        print('{:>10} {:>11.1f} {:>11.1f} {:>11.0f} {:>11.0f} {:>11}'.format(
+            '{}x{}'.format(size_x, size_y), time_it(solve_graph, repeat) * 1e3, time_it(solve_array, repeat) * 1e3,
+            graph_memory / 1024, array_memory / 1024, len(graph_clear) + len(graph_flag)))
+
+
+def bench_graph_memory(sizes: List[Tuple[int, int]], repeat: int) -> None:
+    """memory of building the Graph of every frontier component of a board, the graphs are kept alive while
+    measuring so that the peak includes all their nodes. blocks is the number of memory blocks still allocated
+    once they are built (the live objects and buffers), not the number of allocations made while building them.
+    """
+    print('{:>10} {:>8} {:>11} {:>11} {:>12} {:>11}'.format(
+        'size', 'nodes', 'build (ms)', 'peak (KB)', 'bytes/node', 'blocks'))
+    for size_x, size_y in sizes:
+        grid = MSGrid(grid=make_board(size_x, size_y))
+        tracemalloc.start()
+        solver = GraphSolver(grid)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+        nodes = len(solver.nodes)
+        print('{:>10} {:>8} {:>11.1f} {:>11.0f} {:>12.0f} {:>11}'.format(
+            '{}x{}'.format(size_x, size_y), nodes, time_it(lambda: GraphSolver(grid), repeat) * 1e3,
+            peak / 1024, peak / max(nodes, 1), blocks))
+
+
+def bench_linear(sizes: List[Tuple[int, int]], mine_density: float, games: int) -> None:
+    """plays whole games with the rules of the Graph and, on every component they find nothing about, compares
+    the LinearSolver with the enumeration of the CSPSolver. Its deductions must be a subset of the exact ones.
+    """
+    print('{:>10} {:>11} {:>12} {:>12} {:>12} {:>12}'.format(
+        'size', 'components', 'linear', 'csp', 'linear (ms)', 'csp (ms)'))
+    linear_solver = LinearSolver()
+    csp_solver = CSPSolver()
+    for size_x, size_y in sizes:
+        components = linear_found = csp_found = 0
+        linear_time = csp_time = 0.0
+        for seed in range(games):
+            engine = GameEngine(size_x, size_y, int(size_x * size_y * mine_density), seed=seed, first_click='opening')
+            grid = MSGrid(size_x=size_x, size_y=size_y)
+            solver = GraphSolver(grid)
+            changed = engine.reveal(size_x // 2, size_y // 2)
+            while not engine.game_over:
+                solver.update(grid.update_cells((cell, engine.revealed[cell]) for cell in changed))
+                to_clear, to_flag = solver.solve()
+                for graph in solver.graphs:
+                    if any(solver.solved[graph]):
+                        continue
+                    start = time.perf_counter()
+                    linear_clear, linear_flag = linear_solver.solve_graph(graph)
+                    linear_time += time.perf_counter() - start
+                    start = time.perf_counter()
+                    solution = csp_solver.solve_graph(graph)
+                    csp_time += time.perf_counter() - start
+                    assert set(linear_clear) <= set(solution.safe_locations()) and \
+                        set(linear_flag) <= set(solution.mine_locations()), 'the LinearSolver made a wrong deduction'
+                    components += 1
+                    linear_found += len(linear_clear) + len(linear_flag)
+                    csp_found += len(solution.safe_locations()) + len(solution.mine_locations())
+                if to_clear:
+                    changed = engine.reveal(*to_clear[0])
+                elif to_flag:
+                    changed = engine.flag(*to_flag[0])
+                else:
+                    safe_cells = np.argwhere((engine.state == STATE_DEFAULT) & ~engine.mines)
+                    x, y = safe_cells[engine.rng.integers(len(safe_cells))]
+                    changed = engine.reveal(x, y)
+        print('{:>10} {:>11} {:>12} {:>12} {:>12.1f} {:>12.1f}'.format(
+            '{}x{}'.format(size_x, size_y), components, linear_found, csp_found, linear_time * 1e3, csp_time * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[(9, 9), (16, 30), (100, 100), (480, 480)])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--game-sizes', nargs='+', type=parse_size, default=[(9, 9), (16, 30)],
+                        help='board sizes for the game benchmark, the rebuild solver gets slow on large boards')
+    parser.add_argument('--games', type=int, default=3, help='number of seeded games per size for the game benchmark')
+    parser.add_argument('--mine-density', type=float, default=0.16)
+    parser.add_argument('--boards', type=int, default=1000, help='number of stacked boards for the batch benchmark')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='process pool of the parallel benchmark')
+    parser.add_argument('--presets', nargs='+', choices=list(PRESETS), default=list(PRESETS),
+                        help='boards of the suite benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the suite boards')
+    parser.add_argument('--json', help='file to write the suite results to, with the commit and environment')
+    parser.add_argument('--compare', help='a previous --json file to compare the suite results with')
+    parser.add_argument('--bench', nargs='+',
+                        choices=['suite', 'boundary', 'relax', 'batch', 'reveal', 'generation', 'game', 'linear', 'parallel',
+                                 'array', 'memory'],
+                        default=['suite', 'boundary', 'relax', 'batch', 'reveal', 'generation', 'game', 'linear', 'parallel',
+                                 'array', 'memory'])
+    args = parser.parse_args()
+    if 'suite' in args.bench:
+        results = bench_suite(args.presets, args.repeat, args.seed)
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump({'environment': environment(args.seed, args.repeat), 'results': results}, file, indent=2)
+        if args.compare:
+            compare(results, args.compare)
+    if 'boundary' in args.bench:
+        bench_boundary_flags(args.sizes, args.repeat)
+    if 'relax' in args.bench:
+        bench_relax(args.sizes, args.repeat)
+    if 'batch' in args.bench:
+        bench_batch(args.game_sizes, args.boards, args.repeat)
+    if 'reveal' in args.bench:
+        bench_reveal(args.sizes, args.repeat)
+    if 'generation' in args.bench:
+        bench_generation(args.game_sizes, args.boards, args.repeat, args.mine_density)
+    if 'game' in args.bench:
+        bench_full_game(args.game_sizes, args.mine_density, args.games)
+    if 'linear' in args.bench:
+        bench_linear(args.game_sizes, args.mine_density, args.games)
+    if 'parallel' in args.bench:
+        bench_parallel(args.sizes, args.workers, args.mine_density)
+    if 'array' in args.bench:
+        bench_array_graph(args.sizes, args.repeat)
+    if 'memory' in args.bench:
+        bench_graph_memory(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Mine field generation, for the game engine and for simulations that need a lot of boards."""
+import numpy as np
+from typing import Tuple, Union
+
+SeedLike = Union[None, int, np.random.Generator]
+
+
+def count_neighbour_mines(mines: np.ndarray) -> np.ndarray:
+    """number of mines in the 8 neighbouring cells of every cell, the board is on the last two axes
+    so a stack of boards is counted in one go.
+    """
+    size_x, size_y = mines.shape[-2:]
+    padded = np.pad(mines.astype(np.int8), [(0, 0)] * (mines.ndim - 2) + [(1, 1), (1, 1)])
+    counts = np.zeros(mines.shape, dtype=np.int8)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            if (dx, dy) != (1, 1):
+                counts += padded[..., dx:dx + size_x, dy:dy + size_y]
+    return counts
+
+
+def excluded_cells(size_x: int, size_y: int, first_click: Tuple[int, int] = None, opening: bool = False) -> np.ndarray:
+    """the cells that should not get a mine so that the first click is safe, with opening the cells around it
+    as well so that the first click is a zero and opens a region.
+    """
+    excluded = np.zeros((size_x, size_y), dtype=bool)
+    if first_click is not None:
+        x, y = first_click
+        if opening:
+            excluded[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] = True
+        else:
+            excluded[x, y] = True
+    return excluded
+
+
+def generate_board(size_x: int, size_y: int, num_of_mines: int, seed: SeedLike = None,
+                   first_click: Tuple[int, int] = None, opening: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """places the mines of one board uniformly at random among the allowed cells.
+
+    Args:
+        size_x (int): number of rows
+        size_y (int): number of columns
+        num_of_mines (int): number of mines
+        seed (SeedLike, optional): a seed or a np.random.Generator, the same seed gives the same board. Defaults to None.
+        first_click (Tuple[int, int], optional): cell that must not be a mine. Defaults to None.
+        opening (bool, optional): the neighbours of first_click must not be mines either. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the boolean mine mask and the int8 neighbour mine counts
+    """
+    rng = np.random.default_rng(seed)
+    excluded = excluded_cells(size_x, size_y, first_click, opening)
+    assert num_of_mines <= size_x * size_y - max(np.count_nonzero(excluded), 1), 'not enough cells for the mines!'
+    allowed = np.flatnonzero(~excluded)
+    mines = np.zeros((size_x, size_y), dtype=bool)
+    mines.flat[rng.permutation(allowed)[:num_of_mines]] = True
+    return mines, count_neighbour_mines(mines)
+
+
+def generate_boards(num_boards: int, size_x: int, size_y: int, num_of_mines: int, seed: SeedLike = None,
+                    first_click: Tuple[int, int] = None, opening: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """places the mines of a stack of boards at once, every cell gets a random key and the num_of_mines smallest
+    keys of each board are its mines. The arguments are the same as generate_board, the boards are drawn in a
+    different way so they do not match the ones of generate_board with the same seed.
+    Memory is about 7 bytes per cell (float32 keys, mask and counts), generate large numbers of boards in chunks.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (num_boards, size_x, size_y) mine masks and neighbour mine counts
+    """
+    rng = np.random.default_rng(seed)
+    excluded = excluded_cells(size_x, size_y, first_click, opening).ravel()
+    assert num_of_mines <= size_x * size_y - max(np.count_nonzero(excluded), 1), 'not enough cells for the mines!'
+    keys = rng.random((num_boards, size_x * size_y), dtype=np.float32)
+    # excluded cells can not be among the smallest keys since the random keys are below 1
+    keys[:, excluded] = 2
+    mines = np.zeros(keys.shape, dtype=bool)
+    if num_of_mines:
+        chosen = np.argpartition(keys, num_of_mines - 1, axis=1)[:, :num_of_mines]
+        np.put_along_axis(mines, chosen, True, axis=1)
+    mines = mines.reshape(num_boards, size_x, size_y)
+    return mines, count_neighbour_mines(mines)
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    """a board size given as XxY on the command line, e.g. 16x30"""
+    size_x, size_y = text.lower().split('x')
+    return int(size_x), int(size_y)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import time
+import numpy as np
+from math import comb
+from typing import Dict, List, Tuple
+from graph import Graph, Node
+
+
+class ComponentSolution:
+    """All the mine assignments of one frontier component that satisfy its constraints,
+    summarized by the number of mines they use.
+    """
+    def __init__(self, locations: List[Tuple[int, int]]) -> None:
+        self.locations = locations
+        # number of mines -> number of consistent assignments with that many mines
+        self.solutions_by_mines: Dict[int, float] = {}
+        # number of mines -> for each unknown cell, in how many of those assignments it is a mine
+        self.mine_counts_by_mines: Dict[int, np.ndarray] = {}
+        # whether each cell is a mine (or is safe) in at least one assignment, kept apart from the counts
+        # (which are floats) so that the deductions are exact
+        self.can_be_mine = np.zeros(len(locations), dtype=bool)
+        self.can_be_safe = np.zeros(len(locations), dtype=bool)
+
+    @property
+    def num_solutions(self) -> float:
+        return sum(self.solutions_by_mines.values())
+
+    def mine_counts(self) -> np.ndarray:
+        counts = np.zeros(len(self.locations))
+        for mine_counts in self.mine_counts_by_mines.values():
+            counts += mine_counts
+        return counts
+
+    def safe_locations(self) -> List[Tuple[int, int]]:
+        """cells that are not a mine in any consistent assignment"""
+        if not self.num_solutions:
+            return []
+        return [self.locations[i] for i in np.flatnonzero(~self.can_be_mine)]
+
+    def mine_locations(self) -> List[Tuple[int, int]]:
+        """cells that are a mine in every consistent assignment"""
+        if not self.num_solutions:
+            return []
+        return [self.locations[i] for i in np.flatnonzero(~self.can_be_safe)]
+
+
+class CSPSolver:
+    """Exact solver for the frontier components of a GraphSolver.
+    Enumerates every mine assignment of the unknown vertices of a component that is consistent with its known
+    vertices, with an iterative backtracking search. Unknowns with the same known neighbours are interchangeable,
+    so they are assigned together as a group by their number of mines, weighted by the number of ways to place them.
+    The groups are ordered so that the constraints they share are completed as early as possible and every partial
+    assignment is checked against the bounds of its constraints.
+    """
+    # how many search steps to take between two checks of the deadline
+    CHECK_EVERY = 1024
+
+    def group_variables(self, unknown_vtxs: List[Node]) -> List[List[Node]]:
+        """groups the unknowns by their known neighbours, in breadth first order over the constraints starting
+        from the most constrained group, so that neighbouring groups are assigned one after the other.
+        """
+        groups: Dict[frozenset, List[Node]] = {}
+        for vtx in unknown_vtxs:
+            groups.setdefault(frozenset(vtx.neighbours), []).append(vtx)
+        group_of = {vtx: key for key, group in groups.items() for vtx in group}
+        remaining = set(groups)
+        order = []
+        while remaining:
+            start = max(remaining, key=lambda key: (len(key), -groups[key][0].id))
+            remaining.discard(start)
+            queue = [start]
+            for key in queue:
+                order.append(groups[key])
+                for known in key:
+                    for neighbour in known.neighbours:
+                        if group_of[neighbour] in remaining:
+                            remaining.discard(group_of[neighbour])
+                            queue.append(group_of[neighbour])
+        return order
+
+    def solve_graph(self, graph: Graph, deadline: float = None) -> ComponentSolution | None:
+        """
+        Args:
+            graph (Graph): one component, info nodes are used as extra constraints
+            deadline (float, optional): time.perf_counter() value after which the search is abandoned
+
+        Returns:
+            ComponentSolution | None: None if the deadline was reached before the search finished
+        """
+        groups = self.group_variables(graph.get_unknown_vtxs())
+        constraints = [vtx for vtx in graph.get_known_vtxs() if vtx.degree > 0]
+        index = {vtx: c for c, vtx in enumerate(constraints)}
+        values = [vtx.value for vtx in constraints]
+        mines = [0] * len(constraints)
+        unassigned = [vtx.degree for vtx in constraints]
+        constraints_of = [[index[known] for known in group[0].neighbours] for group in groups]
+        sizes = [len(group) for group in groups]
+        # ways[depth][m] is the number of ways to place m mines in the group at that depth
+        ways = [[comb(size, m) for m in range(size + 1)] for size in sizes]
+
+        n = len(groups)
+        group_sizes = np.array(sizes, dtype=np.int64)
+        assignment = np.zeros(n, dtype=np.int64)
+        solutions_by_mines: Dict[int, int] = {}
+        group_counts_by_mines: Dict[int, np.ndarray] = {}
+        can_be_mine = np.zeros(n, dtype=bool)
+        can_be_safe = np.zeros(n, dtype=bool)
+        # state[depth] is the number of values tried at that depth, the last one is still applied
+        state = [0] * n
+        # weights[depth] is the number of cell assignments the group assignments above depth stand for
+        weights = [1] * (n + 1)
+        num_mines = 0
+        depth = 0
+        steps = 0
+        while depth >= 0:
+            steps += 1
+            if deadline is not None and steps % CSPSolver.CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                return None
+            if depth == n:
+                solutions_by_mines[num_mines] = solutions_by_mines.get(num_mines, 0) + weights[n]
+                if num_mines not in group_counts_by_mines:
+                    group_counts_by_mines[num_mines] = np.zeros(n)
+                group_counts_by_mines[num_mines] += float(weights[n]) * assignment
+                can_be_mine |= assignment > 0
+                can_be_safe |= assignment < group_sizes
+                depth -= 1
+                continue
+            tried = state[depth]
+            if tried:
+                # undo the previous value of this group
+                value = tried - 1
+                for c in constraints_of[depth]:
+                    mines[c] -= value
+                    unassigned[c] += sizes[depth]
+                num_mines -= value
+                assignment[depth] = 0
+            if tried == sizes[depth] + 1:
+                state[depth] = 0
+                depth -= 1
+                continue
+            value = tried
+            state[depth] = tried + 1
+            feasible = True
+            for c in constraints_of[depth]:
+                mines[c] += value
+                unassigned[c] -= sizes[depth]
+                if mines[c] > values[c] or mines[c] + unassigned[c] < values[c]:
+                    feasible = False
+            num_mines += value
+            assignment[depth] = value
+            if feasible:
+                weights[depth + 1] = weights[depth] * ways[depth][value]
+                depth += 1
+
+        # spread the counts of every group evenly over its cells
+        cell_groups = np.repeat(np.arange(n), group_sizes)
+        solution = ComponentSolution([vtx.location for group in groups for vtx in group])
+        solution.solutions_by_mines = {k: float(count) for k, count in solutions_by_mines.items()}
+        solution.mine_counts_by_mines = {
+            k: (counts / np.maximum(group_sizes, 1))[cell_groups] for k, counts in group_counts_by_mines.items()
+        }
+        solution.can_be_mine = can_be_mine[cell_groups]
+        solution.can_be_safe = can_be_safe[cell_groups]
+        return solution
@@ -0,0 +1,214 @@
+import numpy as np
+from typing import List, Tuple
+from board import count_neighbour_mines, generate_board
+from grid import MSGrid, cells_of, neighbour_table
+from regions import label_regions
+
+STATE_DEFAULT = 0
+STATE_CLICKED = 1
+STATE_FLAGGED = 2
+
+
+class GameEngine:
+    """Headless minesweeper game.
+    Holds the mine field and the player's progress as numpy arrays, without any dependency on Tk,
+    so that it can be used both by the UI (which only renders the cells reported as changed) and
+    by simulations that play many games without a display.
+    """
+    def __init__(self, size_x: int, size_y: int, num_of_mines: int, seed: int = None, first_click: str = None,
+                 mines: np.ndarray = None) -> None:
+        """
+        Args:
+            size_x (int): number of rows
+            size_y (int): number of columns
+            num_of_mines (int): number of mines
+            seed (int, optional): seed of the boards, the same seed gives the same games. Defaults to None.
+            first_click (str, optional): None places the mines when the game starts, 'safe' places them on the first
+                click so that it is never a mine and 'opening' so that it is a zero. Defaults to None.
+            mines (np.ndarray, optional): a given mine field for the first game instead of a random one, see reset.
+                Defaults to None.
+        """
+        assert num_of_mines < size_x * size_y, 'there should be at least one cell without a mine!'
+        assert first_click in (None, 'safe', 'opening'), 'unknown first click rule {}'.format(first_click)
+        self.size_x = size_x
+        self.size_y = size_y
+        self.num_of_mines = num_of_mines
+        self.first_click = first_click
+        self.rng = np.random.default_rng(seed)
+        self.neighbour_table = neighbour_table(size_x, size_y)
+        self.reset(mines)
+
+    def reset(self, mines: np.ndarray = None) -> None:
+        """places the mines of a new game and clears the player's progress
+
+        Args:
+            mines (np.ndarray, optional): a given mine field to play instead of a random one, e.g. a generated
+                no guess board. Defaults to None.
+        """
+        shape = (self.size_x, self.size_y)
+        if mines is None:
+            self.place_mines()
+        else:
+            assert mines.shape == shape, 'the mine field should be {}x{}'.format(*shape)
+            self.mines = mines.astype(bool)
+            self.num_of_mines = int(np.count_nonzero(self.mines))
+            self.counts = count_neighbour_mines(self.mines)
+            self.label_openings()
+
+        self.state = np.full(shape, STATE_DEFAULT, dtype=np.int8)
+        # what the player (or the agent) sees, using the MSGrid constants
+        self.revealed = np.zeros(shape) + MSGrid.UKNOWN_CONSTANT
+
+        self.flag_count = 0
+        self.correct_flag_count = 0
+        self.clicked_count = 0
+        self.game_over = False
+        self.won = False
+        self.exploded = None
+
+    def place_mines(self, first_click: Tuple[int, int] = None) -> None:
+        """draws a new mine field, keeping the first click (and its neighbours for an opening) free of mines"""
+        self.mines, self.counts = generate_board(
+            self.size_x, self.size_y, self.num_of_mines, self.rng, first_click, self.first_click == 'opening')
+        self.label_openings()
+
+    def label_openings(self) -> None:
+        """labels the 8-connected regions of zero cells and stores, for every region, the flat indices of the
+        cells a click on it opens: the region itself and its border of numbers (CSR style, the cells of region
+        l are opening_cells[opening_indptr[l - 1]:opening_indptr[l]], 0 is not a label).
+        """
+        self.zero_labels, num_regions = label_regions(~self.mines & (self.counts == 0))
+        # every zero cell opens itself and its 8 neighbours, so a cell is opened by the regions of the zero cells
+        # in its 3x3 window. a number can border more than one region, the window labels are sorted to dedupe them.
+        # the padding of the neighbour table reads the appended 0
+        flat_labels = np.append(self.zero_labels.ravel(), 0)
+        windows = np.concatenate([flat_labels[:-1, None], flat_labels[self.neighbour_table]], axis=1)
+        windows.sort(axis=1)
+        keep = windows > 0
+        keep[:, 1:] &= windows[:, 1:] != windows[:, :-1]
+        cells, _ = np.nonzero(keep)
+        labels = windows[keep]
+        order = np.argsort(labels, kind='stable')
+        self.opening_cells = cells[order]
+        self.opening_indptr = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=num_regions + 1)[1:])])
+
+    def neighbour_indices(self, x: int, y: int) -> np.ndarray:
+        """flat indices of the cells around a cell, a slice of the neighbour table of the board"""
+        row = self.neighbour_table[x * self.size_y + y]
+        return row[row >= 0]
+
+    def neighbours(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """the cells around a cell, see neighbour_indices for the flat indices without the tuples"""
+        return cells_of(self.neighbour_indices(x, y), self.size_y)
+
+    def is_cleared(self) -> bool:
+        return self.clicked_count == self.size_x * self.size_y - self.num_of_mines
+
+    def reveal(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """clicks on a cell, if the cell has no neighbouring mines, the surrounding cells are cleared as well.
+
+        Returns:
+            List[Tuple[int, int]]: the cells whose state has changed
+        """
+        if self.game_over or self.state[x, y] != STATE_DEFAULT:
+            return []
+        if self.first_click is not None and self.clicked_count == 0:
+            self.place_mines((x, y))
+            self.correct_flag_count = int(np.count_nonzero(self.mines & (self.state == STATE_FLAGGED)))
+
+        if self.mines[x, y]:
+            self.state[x, y] = STATE_CLICKED
+            self.revealed[x, y] = MSGrid.MINE
+            self.game_over = True
+            self.exploded = (x, y)
+            return [(x, y)]
+
+        label = self.zero_labels[x, y]
+        if label == 0:
+            changed = []
+            self._open(x, y, changed)
+        else:
+            changed = self._open_region(label, x, y)
+
+        if self.is_cleared():
+            self.game_over = True
+            self.won = True
+        return changed
+
+    def _open_region(self, label: int, x: int, y: int) -> List[Tuple[int, int]]:
+        """opens a whole zero region and its border in one go, using the precomputed opening of the region"""
+        cells = self.opening_cells[self.opening_indptr[label - 1]:self.opening_indptr[label]]
+        if ((self.state.flat[cells] == STATE_FLAGGED) & (self.counts.flat[cells] == 0)).any():
+            # a (wrong) flag on a zero cell stops the cascade, which may split the region
+            return self._flood_fill(x, y)
+        cells = cells[self.state.flat[cells] == STATE_DEFAULT]
+        self.state.flat[cells] = STATE_CLICKED
+        self.revealed.flat[cells] = self.counts.flat[cells]
+        self.clicked_count += len(cells)
+        xs, ys = np.unravel_index(cells, self.state.shape)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def _flood_fill(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """cascade from a zero cell for the regions that are cut by flags, one wave at a time: every wave opens
+        the closed neighbours of the zero cells opened by the previous one, as flat indices into the neighbour table
+        """
+        wave = np.array([x * self.size_y + y])
+        self.state.flat[wave] = STATE_CLICKED
+        opened = [wave]
+        while len(wave):
+            neighbours = self.neighbour_table[wave[self.counts.flat[wave] == 0]].ravel()
+            neighbours = np.unique(neighbours[neighbours >= 0])
+            wave = neighbours[self.state.flat[neighbours] == STATE_DEFAULT]
+            self.state.flat[wave] = STATE_CLICKED
+            opened.append(wave)
+        cells = np.concatenate(opened)
+        self.revealed.flat[cells] = self.counts.flat[cells]
+        self.clicked_count += len(cells)
+        return cells_of(cells, self.size_y)
+
+    def _open(self, x: int, y: int, changed: List[Tuple[int, int]]) -> None:
+        self.state[x, y] = STATE_CLICKED
+        self.revealed[x, y] = self.counts[x, y]
+        self.clicked_count += 1
+        changed.append((x, y))
+
+    def flag(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """toggles the flag on a cell that is not clicked yet
+
+        Returns:
+            List[Tuple[int, int]]: the cells whose state has changed
+        """
+        if self.game_over:
+            return []
+        if self.state[x, y] == STATE_DEFAULT:
+            self.state[x, y] = STATE_FLAGGED
+            self.revealed[x, y] = MSGrid.MINE
+            self.flag_count += 1
+            if self.mines[x, y]:
+                self.correct_flag_count += 1
+        elif self.state[x, y] == STATE_FLAGGED:
+            self.state[x, y] = STATE_DEFAULT
+            self.revealed[x, y] = MSGrid.UKNOWN_CONSTANT
+            self.flag_count -= 1
+            if self.mines[x, y]:
+                self.correct_flag_count -= 1
+        else:
+            return []
+        return [(x, y)]
+
+    def chord(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """clicking on an already clicked number whose neighbouring flags add up to that number
+        clears all the other neighbours of it.
+
+        Returns:
+            List[Tuple[int, int]]: the cells whose state has changed
+        """
+        if self.game_over or self.state[x, y] != STATE_CLICKED:
+            return []
+        neighbours = self.neighbour_indices(x, y)
+        if np.count_nonzero(self.state.flat[neighbours] == STATE_FLAGGED) != self.counts[x, y]:
+            return []
+        changed = []
+        for neighbour in neighbours.tolist():
+            changed += self.reveal(*divmod(neighbour, self.size_y))
+        return changed
@@ -3,8 +3,6 @@ from typing import List, Tuple, Dict
 from exceptions import EdgeAlreadyExists, EdgeDoesNotExists, VertexAlreadyExists
 from enum import Enum
 from itertools import product
-# TODO: instead of updating all the nodes at each iteration,
-# the updated nodes should be checked and only those should be propagated
 
 
 class Value(Enum):
@@ -12,53 +10,19 @@ class Value(Enum):
 
 
 class IDFactory:
-    def __init__(self, digits=10) -> None:
-        self.counter = 0
-        self.digits = digits
-
-    def get_new_id(self):
-        self.counter += 1
-        return "{:0>{}}".format(self.counter, self.digits)
-
-
-class Belief:
-    def __init__(
-        self, degree: int, observed: int, value: int, references: List[Node] = []
-    ) -> None:
-        self.degree = degree
-        self.value = value
-        self.observed = observed
-        self.references = references
-
-    def observe(self, reference=None) -> None:
-        self.observed += 1
-        if reference is not None:
-            self.references.append(reference)
+    __slots__ = ("counter",)
 
-
-class BeliefSet:
     def __init__(self) -> None:
-        self.table = {}
-
-    def get_belief_subjects(self):
-        return list(self.table.keys())
-
-    def aquire_about(self, vertex) -> Belief:
-        return self.table[vertex]
+        self.counter = 0
 
-    def add_observation(self, observed_neighbour: Node, reference=None) -> None:
-        if observed_neighbour in self.table:
-            self.table[observed_neighbour].observe(reference)
-        else:
-            self.table[observed_neighbour] = Belief(
-                degree=observed_neighbour.degree,
-                value=observed_neighbour.value,
-                observed=1,
-                references=[reference],
-            )
+    def get_new_id(self) -> int:
+        self.counter += 1
+        return self.counter
 
 
 class Node:
+    __slots__ = ("id", "value", "neighbours", "degree", "location", "derived")
+
     def __init__(
         self,
         id: int,
@@ -74,23 +38,24 @@ class Node:
         else:
             self.neighbours = neighbours
         self.degree = degree
-        self.beliefs = BeliefSet()
         self.location: Tuple[int, int] = location
+        # the info nodes that were derived from this node
+        self.derived: List[Node] = []
 
     """
     for location, -1, -1 denotes the nodes that are not in
     the original grid and therefore do not have a location
     """
 
-    def reset_beliefs(self) -> None:
-        self.beliefs = BeliefSet()
-
     def __eq__(self, other: Node) -> bool:
-        assert isinstance(
-            other, Node
-        ), "can not compare Node to object type {}".format(type(other))
+        if not isinstance(other, Node):
+            return NotImplemented
         return self.id == other.id
 
+    def __hash__(self) -> int:
+        # ids are ints, unique among the nodes that can meet (see Graph.__init__)
+        return self.id
+
     def is_neighbours_with(self, potential_neighbour: Node) -> bool:
         return potential_neighbour in self.neighbours
 
@@ -128,23 +93,105 @@ class Node:
         return unknown_neighbours
 
 class Graph:
-    def __init__(self) -> None:
-        self.vertexes: List[Node] = []
-        self.id_factory = IDFactory()
+    def __init__(self, id_factory: IDFactory = None) -> None:
+        # graphs that can be merged together (e.g. by the GraphSolver) should share their id factory,
+        # otherwise the ids of their nodes would collide
+        # vertexes and dirty are dicts used as insertion ordered sets
+        self.vertexes: Dict[Node, None] = {}
+        self.id_factory = IDFactory() if id_factory is None else id_factory
         self.location_hash: Dict[Tuple[int, int], Node] = {}
-        self.iteration_threshold = 5
+        # known vertices whose neighbours or value changed since they were last propagated
+        self.dirty: Dict[Node, None] = {}
+        # every unknown vertex gets a bit, so the unknown neighbours of a known vertex are a bitmask (its scope)
+        # and the subsets and differences of the constraints are bitwise operations on python ints.
+        # bits are keyed by their value (1 << index), the freed ones are reused to keep the masks short
+        self.bits: Dict[Node, int] = {}
+        self.bit_nodes: Dict[int, Node] = {}
+        self.free_bits: List[int] = []
+        # the scope of each known vertex, computed when it is first needed after it changed
+        self.masks: Dict[Node, int] = {}
+        # the scope of each propagated known vertex, so that info nodes are not duplicated
+        self.scopes: Dict[int, Node] = {}
+        self.scope_of: Dict[Node, int] = {}
 
     def add_vertex(self, vertex: Node) -> None:
         if vertex.location != (-1, -1):
             if vertex.location in self.location_hash:
                 raise VertexAlreadyExists
-            else:
-                self.vertexes.append(vertex)
-                self.location_hash[vertex.location] = vertex
+            self.location_hash[vertex.location] = vertex
+        self.vertexes[vertex] = None
+        if vertex.value == Value.Unknown:
+            bit = self.free_bits.pop() if self.free_bits else 1 << len(self.bits)
+            self.bits[vertex] = bit
+            self.bit_nodes[bit] = vertex
+        else:
+            self.dirty[vertex] = None
+            self.masks.pop(vertex, None)
 
     def add_edge(self, vertex_1: Node, vertex_2: Node) -> None:
         vertex_1.add_neighbour(vertex_2)
         vertex_2.add_neighbour(vertex_1)
+        self.invalidate(vertex_1)
+        self.invalidate(vertex_2)
+
+    def remove_edge(self, vertex_1: Node, vertex_2: Node) -> None:
+        # invalidated before the edge goes, so that the vertices sharing it are marked dirty as well
+        self.invalidate(vertex_1)
+        self.invalidate(vertex_2)
+        vertex_1.remove_neighbour(vertex_2)
+        vertex_2.remove_neighbour(vertex_1)
+
+    def set_value(self, vertex: Node, value: int) -> None:
+        if vertex.value != value:
+            vertex.value = value
+            self.invalidate(vertex)
+
+    def remove_vertex(self, vertex: Node) -> None:
+        # removing an edge can remove info nodes attached to the same neighbours, hence no iterator here
+        while vertex.neighbours:
+            self.remove_edge(vertex, vertex.neighbours[-1])
+        self.release_vertex(vertex)
+
+    def release_vertex(self, vertex: Node) -> None:
+        """removes a vertex from this graph but keeps its edges, used to move vertices between graphs.
+        """
+        self.invalidate(vertex)
+        del self.vertexes[vertex]
+        self.dirty.pop(vertex, None)
+        bit = self.bits.pop(vertex, None)
+        if bit is not None:
+            del self.bit_nodes[bit]
+            self.free_bits.append(bit)
+        if vertex.location != (-1, -1):
+            del self.location_hash[vertex.location]
+
+    def invalidate(self, vertex: Node) -> None:
+        """marks a known vertex as dirty and removes the info nodes that were derived from it,
+        they will be derived again if they still hold once the vertex is propagated.
+        """
+        if vertex.value == Value.Unknown or vertex not in self.vertexes:
+            return
+        self.dirty[vertex] = None
+        self.masks.pop(vertex, None)
+        # a pair of vertices sharing unknowns with this one may have skipped an info node because this one
+        # had the same scope, they have to be checked again
+        for subject in self.overlapping(vertex):
+            self.dirty[subject] = None
+        scope = self.scope_of.pop(vertex, None)
+        if scope is not None and self.scopes.get(scope) is vertex:
+            del self.scopes[scope]
+        derived, vertex.derived = vertex.derived, []
+        for info_node in derived:
+            if info_node in self.vertexes:
+                self.remove_vertex(info_node)
+
+    def remove_info_nodes(self) -> None:
+        """removes the nodes added by add_new_info_nodes, they are derived from the
+        current state of the graph and have to be recomputed whenever it changes.
+        """
+        for vtx in [vtx for vtx in self.vertexes if vtx.location == (-1, -1)]:
+            if vtx in self.vertexes:
+                self.remove_vertex(vtx)
 
     def get_known_vtxs(self) -> List[Node]:
         known_set = []
@@ -157,7 +204,7 @@ class Graph:
         known_set = []
         for vtx in self.vertexes:
             if vtx.value == Value.Unknown:
-                known_set.append[vtx]
+                known_set.append(vtx)
         return known_set
     
     def location_is_in_graph(self, location: Tuple[int, int]) -> bool:
@@ -181,66 +228,86 @@ class Graph:
     def get_vtx_at(self, location:Tuple[int, int]) -> Node:
         return self.location_hash[location]
 
-    def propagate_from_known_to_unkonwn_vtxs(self) -> None:
-        known_vtxs = self.get_known_vtxs()
-        for vtx in known_vtxs:
-            vtx_neighbours = vtx.neighbours
-            for neighbour in vtx_neighbours:
-                if neighbour.value == Value.Unknown:
-                    neighbour.beliefs.add_observation(vtx)
+    def overlapping(self, vtx: Node) -> Dict[Node, None]:
+        """the known vertices of this graph that share at least one unknown neighbour with a known vertex"""
+        overlapping = {}
+        # known vertices are only connected to unknown ones and the other way around
+        for unknown_neighbour in vtx.neighbours:
+            for other in unknown_neighbour.neighbours:
+                if other is not vtx and other in self.vertexes:
+                    overlapping[other] = None
+        return overlapping
+
+    def mask_of(self, vtx: Node) -> int:
+        """the bitmask of the unknown neighbours of a known vertex"""
+        mask = self.masks.get(vtx)
+        if mask is None:
+            mask = 0
+            for unknown_neighbour in vtx.neighbours:
+                mask |= self.bits[unknown_neighbour]
+            self.masks[vtx] = mask
+        return mask
+
+    def nodes_of(self, mask: int) -> List[Node]:
+        """the unknown vertices of the bits of a mask"""
+        nodes = []
+        while mask:
+            bit = mask & -mask
+            nodes.append(self.bit_nodes[bit])
+            mask ^= bit
+        return nodes
+
+    def register_scope(self, vtx: Node) -> None:
+        scope = self.mask_of(vtx)
+        if scope not in self.scopes:
+            self.scopes[scope] = vtx
+            self.scope_of[vtx] = scope
+
+    def add_new_info_nodes(self, vtx: Node) -> List[Node]:
+        """checks the known vertex against every vertex it shares unknown neighbours with,
+        whenever the unknown neighbours of one are a subset of the other's, the difference is a new
+        info node, with the difference of their values.
 
-    def reset_node_tables(self) -> None:
-        for vtx in self.vertexes:
-            vtx.reset_beliefs()
-
-    def propagate_from_unknown_to_known_vtxs(self) -> None:
-        # although this method is similar to the propagate_from_known_to_unkonwn_vtxs
-        # right now, there might be more substantial differences in the future,
-        # Also they represented different phases of the algorithm,
-        # hence they are implemented in two different methods.
-        unknown_vtxs = self.get_unknown_vtxs()
-        for vtx in unknown_vtxs:
-            vtx_neighbours = vtx.neighbours
-            belief_set = vtx.beliefs
-            for neighbour in vtx_neighbours:
-                if neighbour.value != Value.Unknown:
-                    for belief_subject in belief_set.get_belief_subjects():
-                        if belief_subject == neighbour:
-                            # do not propagate observation of a vertex to itself
-                            continue
-                        neighbour.beliefs.add_observation(
-                            observed_neighbour=belief_subject, reference=vtx
-                        )
-
-    def add_new_info_nodes(self) -> bool:
-        updated = False
-        known_vtxs = self.get_known_vtxs()
-        for vtx in known_vtxs:
-            unknown_neighbours = vtx.get_unknown_neighbours()
-            belief_set = vtx.beliefs
-            belief_subjects = belief_set.get_belief_subjects()
-            for belief_subject in belief_subjects:
-                belief_about_subject = belief_set.aquire_about(belief_subject)
-                if belief_about_subject.degree == belief_about_subject.observed:
-                    # all the unknown neighbours of the belief subject subside under the
-                    # set of unknown neighbours of current vtx, therefore, this vertex will
-                    # definitely observe all that the belief subject will observe.
-                    # TODO: check that the node beign added is not duplicate, e.g. does not
-                    # contain exactly the same info as the current node,
-                    # i.e. does not have the same value, degree and neighbours as current node.
-                    unaffected_neighbours = []
-                    for neighbour in unknown_neighbours:
-                        if neighbour not in belief_about_subject.references:
-                            unaffected_neighbours.append(neighbour)
-                    new_node = Node(
-                        id=self.id_factory.get_new_id(),
-                        value=vtx.value - belief_about_subject.value,
-                    )
-                    self.add_vertex(new_node)
-                    for un in unaffected_neighbours:
-                        self.add_edge(new_node, un)
-                    updated = True
-        return updated
+        Returns:
+            List[Node]: the new info nodes, they still need to be propagated
+        """
+        new_nodes = []
+        mask = self.mask_of(vtx)
+        for other in self.overlapping(vtx):
+            other_mask = self.mask_of(other)
+            shared = mask & other_mask
+            if shared == other_mask and shared != mask:
+                # all the unknown neighbours of the other vertex are unknown neighbours of this one,
+                # the mines of the difference are the difference of their values
+                new_node = self.derive_info_node(vtx, other, mask ^ other_mask)
+            elif shared == mask and shared != other_mask:
+                # and the other way around
+                new_node = self.derive_info_node(other, vtx, other_mask ^ mask)
+            else:
+                continue
+            if new_node is not None:
+                new_nodes.append(new_node)
+        return new_nodes
+
+    def derive_info_node(self, superset_vtx: Node, subset_vtx: Node, scope: int) -> Node | None:
+        if scope in self.scopes:
+            # a vertex with exactly the same unknown neighbours already holds this info
+            return None
+        new_node = Node(
+            id=self.id_factory.get_new_id(),
+            value=superset_vtx.value - subset_vtx.value,
+        )
+        self.add_vertex(new_node)
+        # linked directly rather than with add_edge, the new node is dirty anyway and invalidating it would
+        # mark every vertex sharing its unknowns dirty again
+        for unknown in self.nodes_of(scope):
+            new_node.add_neighbour(unknown)
+            unknown.add_neighbour(new_node)
+        self.masks[new_node] = scope
+        superset_vtx.derived.append(new_node)
+        subset_vtx.derived.append(new_node)
+        self.register_scope(new_node)
+        return new_node
 
     def resolve(self) -> Tuple[List[Node], List[Node]]:
         """
@@ -265,24 +332,21 @@ class Graph:
 
 
     def update_graph(self) -> Tuple[List[Node], List[Node]]:
-        self.reset_node_tables()
-        self.propagate_from_known_to_unkonwn_vtxs()
-        self.propagate_from_unknown_to_known_vtxs()
-        self.add_new_info_nodes()
+        """propagates the dirty vertices, and the info nodes derived from them, until there is nothing
+        left to propagate, i.e. until a fixed point where no new info node can be derived.
+        """
+        while self.dirty:
+            vtx = next(iter(self.dirty))
+            del self.dirty[vtx]
+            self.register_scope(vtx)
+            for new_node in self.add_new_info_nodes(vtx):
+                self.dirty[new_node] = None
         vtxs_to_flag, vtxs_to_clear = self.resolve()
         return vtxs_to_clear, vtxs_to_flag
-        # IMPORTANT TODO: only create graphs from edges
-        # repeat the steps until there is no more change in the graphs
-        #  
 
-    def solve_step(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    def solve_step(self) -> Tuple[List[Node], List[Node]]:
         """
-        This method will be called to solve one step of the game
+        This method will be called to solve one step of the game,
+        returns the vertices to clear and the vertices to flag.
         """
-        vtxs_to_flag, vtxs_to_clear = self.update_graph()
-        iterations = 1
-        print('--')
-        while not vtxs_to_clear and not vtxs_to_flag and iterations < self.iteration_threshold:
-            self.update_graph() 
-            iterations += 1
-        return vtxs_to_clear, vtxs_to_flag
\ No newline at end of file
+        return self.update_graph()
@@ -1,95 +1,397 @@
+from __future__ import annotations
+import time
 import numpy as np
-import numpy.typing as npt
-from graph import Graph, Node
-from typing import List
-from grid import MSGrid
+from multiprocessing import Pool
+from array_graph import ArrayGraph
+from board import count_neighbour_mines
+from csp_solver import ComponentSolution, CSPSolver
+from graph import Graph, IDFactory, Node, Value
+from linear_solver import LinearSolver
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+from grid import MSGrid, cells_of
+from pattern_cache import PatternCache
+from probability import mine_probabilities
+from regions import label_components
 
 
-class GraphSolver:
-    def __init__(self, initial_grid_map) -> None:
-        self.graphs = self.initiate_graphs(initial_grid_map)
+class ComponentResult(NamedTuple):
+    to_clear: List[Tuple[int, int]]
+    to_flag: List[Tuple[int, int]]
+    # the enumeration of the CSPSolver, if it ran and finished
+    solution: ComponentSolution | None
+    linear_deductions: int
+    seconds: float
+    # False when the CSPSolver was skipped or stopped for lack of time, the result must not be cached then
+    complete: bool
+
+
+def solve_stuck_component(graph: Graph, backend: str, deadline: float) -> ComponentResult:
+    """the tiers after the rules, for a component they found nothing about: the LinearSolver and, with the 'csp'
+    backend, the CSPSolver if the elimination found nothing either and there is time left.
+    """
+    start = time.perf_counter()
+    to_clear, to_flag = LinearSolver().solve_graph(graph)
+    linear_deductions = len(to_clear) + len(to_flag)
+    solution = None
+    complete = True
+    if backend == 'csp' and not linear_deductions:
+        # a component that runs out of time gets nothing for now and is tried again by the next solve
+        if time.perf_counter() < deadline:
+            solution = CSPSolver().solve_graph(graph, deadline)
+        if solution is not None:
+            to_clear, to_flag = solution.safe_locations(), solution.mine_locations()
+        else:
+            complete = False
+    return ComponentResult(to_clear, to_flag, solution, linear_deductions, time.perf_counter() - start, complete)
+
+
+def component_cells(graph: Graph) -> Tuple[List[Tuple[int, int]], List[Tuple[Tuple[int, int], int, List[int]]]]:
+    """the unknown cells of a component and the location, value and unknown neighbours (as indices into the unknown
+    cells) of its known vertices, info nodes included, the nodes themselves are linked to the rest of the grid and
+    too deep to pickle.
+    """
+    unknowns = graph.get_unknown_vtxs()
+    index = {vtx: i for i, vtx in enumerate(unknowns)}
+    # the info nodes are implied by the other constraints but they prune the enumeration of the CSPSolver
+    constraints = [(vtx.location, vtx.value, [index[neighbour] for neighbour in vtx.neighbours])
+                   for vtx in graph.get_known_vtxs()]
+    return [vtx.location for vtx in unknowns], constraints
+
+
+def solve_component_cells(unknown_cells: List[Tuple[int, int]], constraints: List[Tuple[Tuple[int, int], int, List[int]]],
+                          backend: str, time_budget: float) -> ComponentResult:
+    """rebuilds a component from component_cells in a worker of the pool and solves it, see solve_stuck_component.
+    The known vertices, info nodes included, are added in the same order and nothing is propagated here, so the
+    result is the same as solving the component inline.
+    """
+    id_factory = IDFactory()
+    graph = Graph(id_factory=id_factory)
+    unknowns = [Node(id=id_factory.get_new_id(), value=Value.Unknown, location=cell) for cell in unknown_cells]
+    for vtx in unknowns:
+        graph.add_vertex(vtx)
+    for location, value, neighbours in constraints:
+        known = Node(id=id_factory.get_new_id(), value=value, location=location)
+        graph.add_vertex(known)
+        for i in neighbours:
+            graph.add_edge(known, unknowns[i])
+    return solve_stuck_component(graph, backend, time.perf_counter() + time_budget)
 
-    def make_graph_from_grid(self, grid: npt.ArrayLike) -> None:
-        """This creates a full graph from all the cells in the grid,
 
+class GraphSolver:
+    """Keeps one Graph per independent island of the frontier, the graphs are long lived:
+    after the grid changes, call update with the changed cells and only the nodes, edges and
+    components around those cells are touched.
+    """
+    def __init__(self, initial_grid_map: MSGrid, backend: str = 'graph', time_budget: float = 0.2,
+                 pattern_cache: PatternCache = None, workers: int = 0, parallel_threshold: int = 64) -> None:
+        """
         Args:
-            grid (npt.ArrayLike): _description_
+            initial_grid_map (MSGrid): the grid to solve, it is kept and read again on every update
+            backend (str, optional): 'graph' solves each component with its Graph, 'array' converts the changed
+                components to an ArrayGraph, which uses less memory on large frontiers. 'linear' uses the Graph and
+                eliminates the constraints of the components it can not make any deduction about with a LinearSolver.
+                'csp' does the same and enumerates the components still left without deductions with a CSPSolver.
+                Defaults to 'graph'.
+            time_budget (float, optional): seconds the 'csp' backend may spend enumerating per call to solve.
+                Defaults to 0.2.
+            pattern_cache (PatternCache, optional): table of the deductions of small windows around the numbers of
+                a component, merged with the ones of the rules. Defaults to None.
+            workers (int, optional): size of a process pool that solves the large components the rules found nothing
+                about with the 'linear' and 'csp' backends, 0 solves everything in this process. The pool is
+                started on first use, call close (or use the solver as a context manager) to stop it. Defaults to 0.
+            parallel_threshold (int, optional): components with fewer vertices are solved in this process, sending
+                them to the pool costs more than solving them. Defaults to 64.
         """
-        cols = grid.shape[0]
-        rows = grid.shape[1]
-        for col in cols:
-            for row in rows:
-                new_node = Node(
-                    id=self.graph.id_factory.get_new_id(),
-                    value=grid[row, col],
-                    location=(row, col),
-                )
-                self.graph.add_vertex(new_node)
-                if cols > 1:
-                    left_neighbour_loc = (col - 1, row)
-                    self.graph.add_edge(
-                        new_node, self.graph.get_vtx_at(left_neighbour_loc)
-                    )
-                if row > 1:
-                    top_neighbour_loc = (col, row - 1)
-                    self.graph.add_edge(
-                        new_node, self.graph.get_vtx_at(top_neighbour_loc)
-                    )
-                if row > 1 and col > 1:
-                    corner_neighbour_loc = (col - 1, row - 1)
-                    self.graph.add_edge(
-                        new_node, self.graph.get_vtx_at(corner_neighbour_loc)
-                    )
-                if row > 1 and col < cols - 1:
-                    corner_neighbour_loc = (col + 1, row - 1)
-                    self.graph.add_edge(
-                        new_node, self.graph.get_vtx_at(corner_neighbour_loc)
-                    )
+        assert backend in ('graph', 'array', 'linear', 'csp'), 'unknown backend {}'.format(backend)
+        self.backend = backend
+        self.time_budget = time_budget
+        self.pattern_cache = pattern_cache
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.pool = None
+        # number of cells the LinearSolver deduced in the components where the rules of the Graph found nothing
+        self.linear_deductions = 0
+        # seconds spent on each component by the last call to solve, the ones solved before are left out
+        self.timings: Dict[Graph, float] = {}
+        self.csp = CSPSolver()
+        # the enumerated solutions of the components the csp backend got to
+        self.solutions: Dict[Graph, ComponentSolution] = {}
+        self.grid = initial_grid_map
+        # all the graphs share one id factory so that their nodes can be moved between them
+        self.id_factory = IDFactory()
+        self.nodes: Dict[Tuple[int, int], Node] = {}
+        self.graph_of: Dict[Tuple[int, int], Graph] = {}
+        self.graphs: List[Graph] = []
+        # solve results of the graphs that have not changed since they were last solved
+        self.solved: Dict[Graph, Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]] = {}
+        self.graphs = self.initiate_graphs(initial_grid_map)
+
+    def is_number(self, cell: Tuple[int, int]) -> bool:
+        return self.grid.grid[cell] >= 0
 
     def initiate_graphs(self, grid: MSGrid) -> List[Graph]:
         """
         This method will act similar to the Grid.get_connected_unknown_cells() method,
         the difference is that this method will create a graph out of each clique while finding 
-        the cliques and will return a list of Graph objects
+        the cliques and will return a list of Graph objects.
+        The graphs only contain the boundary cells, known cells are only connected to their unknown
+        neighbours, flagged cells are left out and their mine is subtracted from the value of their neighbours.
+        The components are labelled on the grid with regions.label_components, a known and an unknown cell of the
+        boundary are connected when they are neighbours, so every region is the cells of one graph.
+        """
+        self.grid = grid
+        self.nodes = {}
+        self.graph_of = {}
+        self.graphs = []
+        self.solved = {}
+        self.solutions = {}
+        unknown = grid.grid == grid.unknown_constant
+        boundary = grid.boundary_flags.astype(bool) & (unknown | (grid.grid >= 0))
+        flags = count_neighbour_mines(grid.grid == MSGrid.MINE)
+        _, regions = label_components(boundary, across=unknown)
+        for cells in regions:
+            cells = cells_of(cells, grid.size_y)
+            known_cells = [cell for cell in cells if not unknown[cell]]
+            if not known_cells:
+                # an unknown cell whose only known neighbours are flags
+                continue
+            graph = Graph(id_factory=self.id_factory)
+            for cell in cells:
+                value = Value.Unknown if unknown[cell] else int(grid.grid[cell]) - int(flags[cell])
+                node = Node(id=self.id_factory.get_new_id(), value=value, location=cell)
+                graph.add_vertex(node)
+                self.nodes[cell] = node
+                self.graph_of[cell] = graph
+            for cell in known_cells:
+                neighbours = grid.neighbour_indices(cell)
+                for neighbour in cells_of(neighbours[unknown.flat[neighbours]], grid.size_y):
+                    graph.add_edge(self.nodes[cell], self.nodes[neighbour])
+            self.graphs.append(graph)
+        return self.graphs
+
+    def update(self, changed_cells: Iterable[Tuple[int, int]]) -> None:
+        """updates the graphs after some cells of the grid have been revealed, flagged or unflagged,
+        the grid itself should already be updated, e.g. with MSGrid.update_cells.
+        """
+        touched = set()
+        to_sync = set()
+        for cell in changed_cells:
+            cell = (int(cell[0]), int(cell[1]))
+            node = self.nodes.get(cell)
+            if node is not None and node.value == Value.Unknown and self.grid.grid[cell] != self.grid.unknown_constant:
+                # the cell was revealed or flagged, the known cells around it are exactly the neighbours of its node.
+                # other known neighbours can only have been revealed in the same update and will be synced anyway
+                to_sync.update(neighbour.location for neighbour in node.neighbours if neighbour.location != (-1, -1))
+                self.remove_node(node, touched)
+            if self.is_number(cell):
+                to_sync.add(cell)
+            elif self.grid.grid[cell] == self.grid.unknown_constant:
+                # unflagged, the known cells around it get a new unknown neighbour
+                neighbours = self.grid.neighbour_indices(cell)
+                to_sync.update(cells_of(neighbours[self.grid.grid.flat[neighbours] >= 0], self.grid.size_y))
+        for cell in to_sync:
+            self.sync_known_cell(cell, touched)
+        self.repartition(touched)
+
+    def new_node(self, cell: Tuple[int, int], value, touched: Set[Graph]) -> Node:
+        node = Node(id=self.id_factory.get_new_id(), value=value, location=cell)
+        graph = Graph(id_factory=self.id_factory)
+        graph.add_vertex(node)
+        self.nodes[cell] = node
+        self.graph_of[cell] = graph
+        touched.add(graph)
+        return node
+
+    def remove_node(self, node: Node, touched: Set[Graph]) -> None:
+        graph = self.graph_of.pop(node.location)
+        del self.nodes[node.location]
+        touched.add(graph)
+        graph.remove_vertex(node)
+
+    def sync_known_cell(self, cell: Tuple[int, int], touched: Set[Graph]) -> None:
+        """makes the node of a known cell match the grid: its value (minus the flagged neighbours)
+        and an edge to each of its unknown neighbours. Nodes left without edges are removed.
+        """
+        node = self.nodes.get(cell)
+        if node is None and not self.grid.boundary_flags[cell]:
+            # a known cell is only on the boundary if it has an unknown neighbour
+            return
+        neighbours = self.grid.neighbour_indices(cell)
+        values = self.grid.grid.flat[neighbours]
+        unknown_neighbours = set(cells_of(neighbours[values == self.grid.unknown_constant], self.grid.size_y))
+        flags = int(np.count_nonzero(values == MSGrid.MINE))
+        if not unknown_neighbours:
+            if node is not None:
+                self.remove_node(node, touched)
+            return
+        if node is None:
+            node = self.new_node(cell, int(self.grid.grid[cell]) - flags, touched)
+        else:
+            self.graph_of[cell].set_value(node, int(self.grid.grid[cell]) - flags)
+            touched.add(self.graph_of[cell])
+
+        graph = self.graph_of[cell]
+        connected = set(neighbour.location for neighbour in node.neighbours)
+        for location in connected - unknown_neighbours:
+            unknown_node = self.nodes[location]
+            graph.remove_edge(node, unknown_node)
+            if unknown_node.degree == 0:
+                self.remove_node(unknown_node, touched)
+        for location in unknown_neighbours - connected:
+            unknown_node = self.nodes.get(location)
+            if unknown_node is None:
+                unknown_node = self.new_node(location, Value.Unknown, touched)
+            else:
+                touched.add(self.graph_of[location])
+            graph.add_edge(node, unknown_node)
+
+    def repartition(self, touched: Set[Graph]) -> None:
+        """splits and merges the touched graphs into the connected components of their nodes.
+        The nodes, edges and the info derived from them are reused: each component keeps the graph that
+        already held most of it and only the nodes that changed or moved in from other graphs are propagated again.
         """
-        # This function is wrong because:
-        # 1: it adds all the cells to the graph, not just the ones that are 
-        # on the boundary,
-        # 2: it adds some edges more than once
+        if not touched:
+            return
+        for graph in touched:
+            self.solved.pop(graph, None)
+            self.solutions.pop(graph, None)
+        nodes = [vtx for graph in touched for vtx in graph.vertexes if vtx.location != (-1, -1)]
+        new_graphs = []
+        kept = set()
         visited = set()
-        graphs = []
-        for x in range(grid.size_x):
-            for y in range(grid.size_y):
-                if grid.boundary_flags[x, y]:
-                    if (x, y) not in visited and grid.grid[x, y] == grid.unknown_constant:
-                        graph = Graph()
-                        stack = [(x, y)]
-                        while stack:
-                            cell = stack.pop()
-                            if cell not in visited:
-                                visited.add(cell)
-                                if cell not in graph.location_hash:
-                                    node = Node(id=graph.id_factory.get_new_id(), value=grid.grid[cell], location=cell)
-                                    graph.add_vertex(node)
-                                for neighbour_location in grid.get_cell_neighbours(cell):
-                                    if grid.boundary_flags[neighbour_location]:
-                                        if neighbour_location not in visited:
-                                            stack.append(neighbour_location)
-                                        if neighbour_location not in graph.location_hash:
-                                            neighbour_node = Node(id=graph.id_factory.get_new_id(), value=grid.grid[neighbour_location], location=neighbour_location)
-                                            graph.add_vertex(neighbour_node)
-                                            graph.add_edge(node, neighbour_node)
-                        graphs.append(graph)
-        return graphs
-                    
-
-    def solve(self) -> None:
+        for start in nodes:
+            if start in visited:
+                continue
+            component = []
+            visited.add(start)
+            stack = [start]
+            while stack:
+                vtx = stack.pop()
+                component.append(vtx)
+                for neighbour in vtx.neighbours:
+                    # info nodes are not part of the grid, they follow the nodes they are derived from
+                    if neighbour.location != (-1, -1) and neighbour not in visited:
+                        visited.add(neighbour)
+                        stack.append(neighbour)
+            owners: Dict[Graph, int] = {}
+            for vtx in component:
+                owner = self.graph_of[vtx.location]
+                owners[owner] = owners.get(owner, 0) + 1
+            graph = next((owner for owner in sorted(owners, key=owners.get, reverse=True) if owner not in kept), None)
+            if graph is None:
+                graph = Graph(id_factory=self.id_factory)
+            kept.add(graph)
+            for vtx in component:
+                owner = self.graph_of[vtx.location]
+                if owner is not graph:
+                    owner.release_vertex(vtx)
+                    graph.add_vertex(vtx)
+                    self.graph_of[vtx.location] = graph
+            new_graphs.append(graph)
+        self.graphs = [graph for graph in self.graphs if graph not in touched] + new_graphs
+
+    def solve(self) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        Returns:
+            Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]: the locations to clear and the locations to flag
+        """
+        deadline = time.perf_counter() + self.time_budget
+        self.timings = {}
+        # smallest components first, so that one large component does not use up the budget of the others
+        graphs = sorted(self.graphs, key=lambda graph: len(graph.vertexes))
+        stuck = []
+        for graph in graphs:
+            if graph in self.solved:
+                continue
+            start = time.perf_counter()
+            if self.backend == 'array':
+                graph_to_clear, graph_to_flag = ArrayGraph.from_graph(graph).solve_step()
+            else:
+                vtxs_to_clear, vtxs_to_flag = graph.solve_step()
+                graph_to_clear = [vtx.location for vtx in vtxs_to_clear]
+                graph_to_flag = [vtx.location for vtx in vtxs_to_flag]
+            if self.pattern_cache is not None:
+                # a window only covers part of the component and the rules only pairs of its constraints, each can
+                # find cells the other misses, so both run and their deductions are merged
+                cache_to_clear, cache_to_flag = self.pattern_cache.deductions(
+                    self.grid, [vtx.location for vtx in graph.get_known_vtxs() if vtx.location != (-1, -1)])
+                # a window can reach the cells of another component, whose results are cached separately
+                graph_to_clear = list(dict.fromkeys(
+                    graph_to_clear + [cell for cell in cache_to_clear if self.graph_of.get(cell) is graph]))
+                graph_to_flag = list(dict.fromkeys(
+                    graph_to_flag + [cell for cell in cache_to_flag if self.graph_of.get(cell) is graph]))
+            self.solved[graph] = graph_to_clear, graph_to_flag
+            self.timings[graph] = time.perf_counter() - start
+            if self.backend in ('linear', 'csp') and not any(self.solved[graph]):
+                stuck.append(graph)
+
+        # the tiers after the rules only read the graphs, so the large components can be solved in other processes
+        # while the small ones are solved here. The results are stored per graph and merged in the order of graphs,
+        # whatever order they arrive in
+        pending = {}
+        if self.workers:
+            for graph in stuck:
+                if len(graph.vertexes) >= self.parallel_threshold:
+                    if self.pool is None:
+                        self.pool = Pool(self.workers)
+                    pending[graph] = self.pool.apply_async(solve_component_cells, (
+                        *component_cells(graph), self.backend, max(deadline - time.perf_counter(), 0)))
+        for graph in stuck:
+            if graph in pending:
+                continue
+            self.store_result(graph, solve_stuck_component(graph, self.backend, deadline))
+        for graph, result in pending.items():
+            self.store_result(graph, result.get())
+
         to_clear = []
         to_flag = []
-        for graph in self.graphs:
-            # todo: it makes more sense to have the graph loop wrapped in an iteration loop, but I'm gonna leave 
-            # it for now cause I'm lazy :)
-            vtxs_to_clear, vtxs_to_flag = graph.solve_step()
-            to_clear += [vtx.location for vtx in vtxs_to_clear]
-            to_flag += [vtx.location for vtx in vtxs_to_flag]
-        return to_flag, to_clear
\ No newline at end of file
+        for graph in graphs:
+            graph_to_clear, graph_to_flag = self.solved.get(graph, ([], []))
+            to_clear += graph_to_clear
+            to_flag += graph_to_flag
+        # a cell can be deduced by more than one of its neighbours. Sorted since the order of the graphs and of their
+        # nodes depends on hashes and on where a component was solved, so the same grid always gives the same moves
+        return sorted(set(to_clear)), sorted(set(to_flag))
+
+    def store_result(self, graph: Graph, result: ComponentResult) -> None:
+        if result.complete:
+            self.solved[graph] = result.to_clear, result.to_flag
+        else:
+            # the rules found nothing either, the next solve tries the component again
+            self.solved.pop(graph, None)
+        if result.solution is not None:
+            self.solutions[graph] = result.solution
+        self.linear_deductions += result.linear_deductions
+        self.timings[graph] += result.seconds
+
+    def close(self) -> None:
+        """stops the process pool, if it was started"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def __enter__(self) -> 'GraphSolver':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def mine_probabilities(self, num_of_mines: int) -> np.ndarray:
+        """probability of each cell of the grid being a mine, see probability.mine_probabilities.
+        The components that have not been enumerated yet are enumerated within the time budget, the cells of those
+        that run out of time get the largest value / degree of their known neighbours instead.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        solutions = []
+        estimates = {}
+        for graph in sorted(self.graphs, key=lambda graph: len(graph.vertexes)):
+            if graph not in self.solutions and time.perf_counter() < deadline:
+                solution = self.csp.solve_graph(graph, deadline)
+                if solution is not None:
+                    self.solutions[graph] = solution
+            if graph in self.solutions:
+                solutions.append(self.solutions[graph])
+            else:
+                for vtx in graph.get_unknown_vtxs():
+                    estimates[vtx.location] = max(known.value / known.degree for known in vtx.neighbours)
+        return mine_probabilities(self.grid, solutions, num_of_mines, estimates)
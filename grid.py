@@ -1,6 +1,34 @@
 import numpy as np 
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Iterable, List, Set, Tuple
 from itertools import product 
+from regions import label_components
+
+
+@lru_cache(maxsize=16)
+def neighbour_table(size_x: int, size_y: int, radius_x: int = 1, radius_y: int = 1) -> np.ndarray:
+    """flat indices (x * size_y + y) of the neighbours of every cell of a board within the radii, the cell itself
+    left out. Row i holds the neighbours of the cell with flat index i in row major order of their offsets, the ones
+    off the board are -1 so that every row has the same length, e.g. np.append(mask.ravel(), False)[table] reads
+    a mask at the neighbours of every cell with the cells off the board as False.
+    The tables are cached per board size and radii and shared, they are read only.
+
+    Returns:
+        np.ndarray: (size_x * size_y, (2 * radius_x + 1) * (2 * radius_y + 1) - 1) int64 array
+    """
+    padded = np.pad(np.arange(size_x * size_y).reshape(size_x, size_y), [(radius_x, radius_x), (radius_y, radius_y)],
+                    constant_values=-1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (2 * radius_x + 1, 2 * radius_y + 1))
+    windows = windows.reshape(size_x * size_y, -1)
+    centre = radius_x * (2 * radius_y + 1) + radius_y
+    table = np.delete(windows, centre, axis=1)
+    table.flags.writeable = False
+    return table
+
+
+def cells_of(indices: np.ndarray, size_y: int) -> List[Tuple[int, int]]:
+    """the (x, y) cells of flat indices into a board with size_y columns"""
+    return list(zip(*(axis.tolist() for axis in np.divmod(indices, size_y))))
 
 class MSGrid:
     """MineSweeper Grid as a class 
@@ -24,93 +52,147 @@ class MSGrid:
             self.size_y = size_y
             self.grid = np.zeros((size_x, size_y)) + self.unknown_constant
             self.boundary_flags = np.zeros((self.size_x, self.size_y))
+            self.unknown_frontier: Set[Tuple[int, int]] = set()
 
     def mark_boundary_flags(self) -> None:
         """
         boundary cells are same as non_trivial cells, basically either an unkonwn cell that has at least one known
         neighbour or a known cell that has at least one unknown neighbour. 
         These are the only important cells in solving the problem. 
-        This method will iterate the grid, and whereever there is a non_trivial cell, mark that location in the 
-        self.boundary_flags map to True
+        This method will mark the location of every non_trivial cell in the self.boundary_flags map as True,
+        see boundary_mask for how they are found.
         """
-        # for each cell we will check the four cells to the right, left bottom, bottom and right bottom
-        # the other foru will have been checked when we were at the left, top right, etc.. cells.
-        neighbour_offsets = [
-            (1, 0), (-1, 1), (0, 1), (1, 1)
-        ]
-        for i in range(self.size_x):
-            for j in range(self.size_y):
-                for neighbour_offset in neighbour_offsets:
-                    neighbour_index = (i + neighbour_offset[0], j + neighbour_offset[1])
-                    if -1 < neighbour_index[0] < self.size_x and -1 < neighbour_index[1] < self.size_y:
-                        if (self.grid[i, j] == self.unknown_constant) != (self.grid[neighbour_index] == self.unknown_constant):
-                            self.boundary_flags[i, j] = 1
-                            self.boundary_flags[neighbour_index] = 1 
-
-
-
-    def get_known_cells(self):
-        known_cells = []
-        for col in self.size_x:
-            for row in self.size_y:
-                if self.grid[col, row] != self.unknown_constant:
-                    known_cells.append((col, row))
-        return known_cells
+        unknown = self.grid == self.unknown_constant
+        self.boundary_flags[:, :] = MSGrid.boundary_mask(unknown)
+        # the unknown cells on the boundary, i.e. the cells the solver has to make a decision about
+        self.unknown_frontier: Set[Tuple[int, int]] = set(
+            (int(x), int(y)) for x, y in np.argwhere(self.boundary_flags.astype(bool) & unknown)
+        )
+
+    @staticmethod
+    def boundary_mask(unknown: np.ndarray) -> np.ndarray:
+        """vectorized search for the boundary cells of a known/unknown mask.
+
+        Args:
+            unknown (np.ndarray): boolean array, True where the cell is unknown, (X, Y) or (N, X, Y)
+
+        Returns:
+            np.ndarray: boolean array, True where the cell is on the boundary
+        """
+        # each cell is compared with the cells below, to the right and on both diagonals using shifted
+        # views of the mask, whenever a pair differs both cells of the pair are on the boundary.
+        # the other four directions are covered by the same pairs seen from the other side.
+        flags = np.zeros(unknown.shape, dtype=bool)
+        diff = unknown[..., 1:, :] != unknown[..., :-1, :]
+        flags[..., 1:, :] |= diff
+        flags[..., :-1, :] |= diff
+        diff = unknown[..., :, 1:] != unknown[..., :, :-1]
+        flags[..., :, 1:] |= diff
+        flags[..., :, :-1] |= diff
+        diff = unknown[..., 1:, 1:] != unknown[..., :-1, :-1]
+        flags[..., 1:, 1:] |= diff
+        flags[..., :-1, :-1] |= diff
+        diff = unknown[..., 1:, :-1] != unknown[..., :-1, 1:]
+        flags[..., 1:, :-1] |= diff
+        flags[..., :-1, 1:] |= diff
+        return flags
+
+    def update_cells(self, updates: Iterable[Tuple[Tuple[int, int], float]]) -> List[Tuple[int, int]]:
+        """applies cell update events (a revealed value, MSGrid.MINE for a flag or the unknown constant for
+        an unflag) to the grid and keeps the boundary flags and the unknown frontier up to date.
+        Only the 3x3 windows around the cells that went from unknown to known (or back) are recomputed,
+        so the cost depends on the number of changed cells and not on the size of the board.
+
+        Args:
+            updates (Iterable[Tuple[Tuple[int, int], float]]): pairs of ((x, y), new value)
+
+        Returns:
+            List[Tuple[int, int]]: the cells that changed between known and unknown
+        """
+        changed = []
+        for location, value in updates:
+            location = (int(location[0]), int(location[1]))
+            was_unknown = self.grid[location] == self.unknown_constant
+            self.grid[location] = value
+            if was_unknown != (value == self.unknown_constant):
+                changed.append(location)
+        if not changed:
+            return changed
+        x_range = (min(x for x, _ in changed), max(x for x, _ in changed) + 1)
+        y_range = (min(y for _, y in changed), max(y for _, y in changed) + 1)
+        if (x_range[1] - x_range[0]) * (y_range[1] - y_range[0]) <= 9 * len(changed):
+            # dense changes, e.g. an opening, are cheaper to refresh in one go
+            self.refresh_boundary_in(x_range, y_range)
+        else:
+            for location in changed:
+                self.refresh_boundary_in((location[0], location[0] + 1), (location[1], location[1] + 1))
+        return changed
+
+    def refresh_boundary_in(self, x_range: Tuple[int, int], y_range: Tuple[int, int]) -> None:
+        """recomputes the boundary flags and the unknown frontier around a block of cells that have
+        changed status, i.e. the block itself and a margin of one cell.
+
+        Args:
+            x_range (Tuple[int, int]): first and one past the last row of the changed block
+            y_range (Tuple[int, int]): first and one past the last column of the changed block
+        """
+        # the flags of the block plus its margin depend on their own neighbours, hence a margin of two in the grid
+        outer_x0, outer_x1 = max(x_range[0] - 2, 0), min(x_range[1] + 2, self.size_x)
+        outer_y0, outer_y1 = max(y_range[0] - 2, 0), min(y_range[1] + 2, self.size_y)
+        x0, x1 = max(x_range[0] - 1, 0), min(x_range[1] + 1, self.size_x)
+        y0, y1 = max(y_range[0] - 1, 0), min(y_range[1] + 1, self.size_y)
+        unknown = self.grid[outer_x0:outer_x1, outer_y0:outer_y1] == self.unknown_constant
+        window = MSGrid.boundary_mask(unknown)[x0 - outer_x0:x1 - outer_x0, y0 - outer_y0:y1 - outer_y0]
+        self.boundary_flags[x0:x1, y0:y1] = window
+        frontier = window & unknown[x0 - outer_x0:x1 - outer_x0, y0 - outer_y0:y1 - outer_y0]
+        for cell in product(range(x0, x1), range(y0, y1)):
+            self.unknown_frontier.discard(cell)
+        for x, y in np.argwhere(frontier):
+            self.unknown_frontier.add((int(x) + x0, int(y) + y0))
+
+    def get_known_cells(self) -> List[Tuple[int, int]]:
+        return cells_of(np.flatnonzero(self.grid != self.unknown_constant), self.size_y)
     
-    def cell_is_edge(self, cell_location: Tuple[int, int]):
-        is_known = self.grid[cell_location] != self.unknown_constant
-        x_offsets = [-1, 0, 1]
-        y_offsets = [-1, 0, 1]
-        neighbouring_offsets = product(x_offsets, y_offsets)
-        for neighbouring_offset in neighbouring_offsets:
-            if neighbouring_offset != (0, 0):
-                neighbour = (cell_location[0] + neighbouring_offset[0], cell_location[1] + neighbouring_offset[1])
-                neighbour_is_known = self.grid[neighbour] != self.unknown_constant
-                if is_known == neighbour_is_known:
-                    # if found a neighbour of opposite status (known vs. unkonwn)
-                    return True
-        return False
+    def cell_is_edge(self, cell_location: Tuple[int, int]) -> bool:
+        """whether the cell has a neighbour of the opposite status (known vs. unknown), i.e. is on the boundary"""
+        neighbours = self.neighbour_indices(cell_location)
+        is_unknown = self.grid[cell_location] == self.unknown_constant
+        return bool(((self.grid.flat[neighbours] == self.unknown_constant) != is_unknown).any())
 
 
+    def neighbour_indices(self, cell_location: Tuple[int, int], radius_x: int = 1, radius_y: int = 1) -> np.ndarray:
+        """flat indices of the cells around a cell inside the board, a slice of neighbour_table, e.g. to read
+        grid.flat at the neighbours without building a tuple per cell
+        """
+        row = neighbour_table(self.size_x, self.size_y, radius_x, radius_y)[cell_location[0] * self.size_y + cell_location[1]]
+        return row[row >= 0]
+
     def get_cell_neighbours(self, cell_location:Tuple[int, int], radius:int=1, radius_x:int=None, radius_y:int=None) -> List[Tuple[int, int]]:
-        """_summary_
+        """the cells around a cell, inside the board, see neighbour_indices for the flat indices without the tuples.
 
         Args:
             radius (int, optional): raduis of neighbours in both dirs, ignored if radius_x and raduis_y are given. Defaults to 1.
-            radius_x (_type_, optional): raduis in direction of cols, also needs to have radius_y. Defaults to None.
+            radius_x (_type_, optional): raduis in direction of rows, also needs to have radius_y. Defaults to None.
             radius_y (_type_, optional): raduis in direction of cols. Defaults to None.
 
         Returns:
-            List[Tuple[int, int]]: _description_
+            List[Tuple[int, int]]: the neighbours in row major order, without the cell itself
         """
         assert type(radius_x) == type(radius_y), 'radiux_x and raduis_y should both be ints or both be None!'
         if radius_x is None:
             radius_x = radius
             radius_y = radius 
-        x_offsets = [r for r in range(radius_x + 1)] + [0] + [r for r in range(radius_x + 1)]
-        y_offsets = [r for r in range(radius_y + 1)] + [0] + [r for r in range(radius_y + 1)]
-
-        list_of_neighbours = []
-        neighbouring_offsets = product(x_offsets, y_offsets)
-        for neighbouring_offset in neighbouring_offsets:
-            if neighbouring_offset != (0, 0):
-                neighbour = (cell_location[0] + neighbouring_offset[0], cell_location[1] + neighbouring_offset[1])
-                if -1 < neighbour[0] < self.size_x and -1 < neighbour[1] < self.size_y: 
-                    list_of_neighbours.append(neighbour)
-        return list_of_neighbours
+        return cells_of(self.neighbour_indices(cell_location, radius_x, radius_y), self.size_y)
 
 
     def get_unknown_cells(self) -> List[Tuple[int, int]]:
         """in this context, unkown cells are cells that 
         are not known but also are adjacent to at least one known cell
         """
-        unknown_cells = {}
-        known_cells = self.get_known_cells()
-        for known_cell in known_cells:
-            for neighbour_location in self.get_cell_neighbours(known_cell):
-                if self.grid[neighbour_location[0], neighbour_location[1]] == self.unknown_constant:
-                    unknown_cells.add(neighbour_location)
-        return list(unknown_cells)
+        known = np.append((self.grid != self.unknown_constant).ravel(), False)
+        # the padding of the table reads the appended False
+        next_to_known = known[neighbour_table(self.size_x, self.size_y)].any(axis=1)
+        return cells_of(np.flatnonzero(~known[:-1] & next_to_known), self.size_y)
     
 
     def get_connected_unknown_cells(self) -> List[List[Tuple[int, int]]]:
@@ -119,28 +201,9 @@ class MSGrid:
         until they remain unconnected). 
 
         Returns:
-            List[List[Tuple[int, int]]]: A list of connected unknown cells, each unknown cell is in itself another 
-            list of tuples of form (x, y)
+            List[List[Tuple[int, int]]]: A list of the 8-connected regions of unknown cells, in row major order of
+            their first cell, each region is in itself a list of tuples of form (x, y) in row major order
         """
-        # This will run a dfs on the edges of the islands to find the cliques of unknown cells 
-        # A non_trivial known cell is a cell that is known and adjacent to at least one unknown cell
-        # Similarly, a non_trivial unknown cell is one that is adjacent to at least one known cell
-
-        def dfs(cell):
-            if cell not in visited:
-                visited.add(cell)
-                if self.grid[cell] == self.unknown_constant:
-                    clique.append(cell)
-                    for neighbour in self.get_cell_neighbours(cell):
-                        if neighbour not in visited:
-                            dfs(neighbour)
-
-        cliques = []
-        visited = set()
-        for x in range(self.size_x):
-            for y in range(self.size_y):
-                if (x, y) not in visited and self.grid[x, y] == self.unknown_constant:
-                    clique = []
-                    dfs((x, y))
-                    cliques.append(clique)
-        return cliques
\ No newline at end of file
+        # the unknown regions are labelled without recursion, see regions.label_regions
+        _, regions = label_components(self.grid == self.unknown_constant)
+        return [cells_of(cells, self.size_y) for cells in regions]
\ No newline at end of file
@@ -3,25 +3,32 @@
 
 from tkinter import *
 from tkinter import messagebox as tkMessageBox
-from collections import deque
 import random
 import platform
 import time
 from datetime import time, date, datetime
 import numpy as np 
+from collections import deque
 
 # from solver import solve
 # from graph import Graph
-from graph_solver import GraphSolver
 from grid import MSGrid
+from solver_worker import SolverWorker
+from engine import GameEngine, STATE_DEFAULT, STATE_CLICKED, STATE_FLAGGED
 
 SIZE_X = 10
 SIZE_Y = 10
 NUM_OF_MINES = 10
-
-STATE_DEFAULT = 0
-STATE_CLICKED = 1
-STATE_FLAGGED = 2
+# 'canvas' draws the board on a single Canvas, 'buttons' uses one Button widget per tile
+RENDERER = 'canvas'
+# delay between two ticks of the auto solver in ms, every tick plays all the certain moves of one solve
+SPEEDS = {
+    "slow": 1000,
+    "normal": 250,
+    "fast": 50,
+    "turbo": 0,
+}
+AUTOPLAY_SPEED = "slow"
 
 UNKNOWN = MSGrid.UKNOWN_CONSTANT
 MINE = MSGrid.MINE
@@ -31,6 +38,9 @@ EMPTY = MSGrid.EMPTY
 BTN_CLICK = "<Button-1>"
 BTN_FLAG = "<Button-2>" if platform.system() == 'Darwin' else "<Button-3>"
 
+# what a tile shows, as an index in Minesweeper.tileImages, the number n is TILE_NUMBER + n - 1
+TILE_PLAIN, TILE_CLICKED, TILE_MINE, TILE_FLAG, TILE_WRONG, TILE_NUMBER = range(6)
+
 window = None
 
 class Minesweeper:
@@ -49,6 +59,22 @@ class Minesweeper:
 
         for i in range(1, 9):
             self.images["numbers"].append(PhotoImage(file = "images/tile_"+str(i)+".gif"))
+        self.tileImages = [
+            self.images["plain"], self.images["clicked"], self.images["mine"], self.images["flag"], self.images["wrong"]
+        ] + self.images["numbers"]
+        self.tileSize = self.images["plain"].width()
+        # the board widgets are created once and reused by every game
+        self.canvas = None
+        self.tiles = None
+        self.shown = np.full((SIZE_X, SIZE_Y), TILE_PLAIN, dtype=np.int8)
+        self.dirty = set()
+        self.renderScheduled = False
+        # the solver runs in a background thread, its moves are polled from the Tk loop
+        self.worker = SolverWorker(backend='csp')
+        self.gameNumber = 0
+        self.solverPending = False
+        # set when there was nothing left to guess, the next change of the board starts the auto solver again
+        self.autoplayStopped = False
 
         # set up frame
         self.tk = tk
@@ -64,30 +90,51 @@ class Minesweeper:
         self.labels["time"].grid(row = 0, column = 0, columnspan = SIZE_Y) # top full width
         self.labels["mines"].grid(row = SIZE_X+1, column = 0, columnspan = int(SIZE_Y/2)) # bottom left
         self.labels["flags"].grid(row = SIZE_X+1, column = int(SIZE_Y/2)-1, columnspan = int(SIZE_Y/2)) # bottom right
+        self.labels["moves"] = Label(self.frame, text = "Moves/s: 0")
+        self.labels["moves"].grid(row = SIZE_X+2, column = 0, columnspan = int(SIZE_Y/2)) # below mines
+        self.speed = StringVar(self.frame, AUTOPLAY_SPEED)
+        self.speedMenu = OptionMenu(self.frame, self.speed, *SPEEDS)
+        self.speedMenu.grid(row = SIZE_X+2, column = int(SIZE_Y/2)-1, columnspan = int(SIZE_Y/2)) # below flags
+        # (time, number of moves) of the recent ticks of the auto solver
+        self.moveTimes = deque()
 
         self.restart() # start game
         self.updateTimer() # init timer
+        self.pollSolver() # init solver polling
 
 
     def setup(self):
-        self.tile_for_agent = np.zeros((SIZE_X, SIZE_Y)) + UNKNOWN
-
-        # create flag and clicked tile variables
-        self.flagCount = 0
-        self.correctFlagCount = 0
-        self.clickedCount = 0
+        self.engine = GameEngine(SIZE_X, SIZE_Y, NUM_OF_MINES)
+        # the agent's view of the board is engine.revealed, the worker gets a copy of it with every request
+        self.gameNumber += 1
         self.startTime = None
 
-        # create buttons
-        self.tiles = dict({})
-        self.mines = 0
-
-        mine_indexes = np.arange(SIZE_X * SIZE_Y)
-        np.random.shuffle(mine_indexes)
-        mine_indexes = mine_indexes[:NUM_OF_MINES]
-        mine_indexes = [(mine_index//SIZE_X, mine_index%SIZE_X) for mine_index in mine_indexes]
-        self.mines = NUM_OF_MINES
+        # the game state itself lives in self.engine, a new game only redraws the tiles that are not plain
+        if RENDERER == 'canvas':
+            self.setupCanvas()
+        else:
+            self.setupButtons()
+        self.renderTiles([(int(x), int(y)) for x, y in np.argwhere(self.shown != TILE_PLAIN)])
 
+    def setupCanvas(self):
+        if self.canvas is not None:
+            return
+        width, height = SIZE_Y * self.tileSize, SIZE_X * self.tileSize
+        self.canvas = Canvas(self.frame, width = width, height = height, highlightthickness = 0, borderwidth = 0)
+        # the plain board is a single image, a photo copy to a region repeats the plain tile over all of it
+        self.boardImage = PhotoImage(width = width, height = height)
+        self.boardImage.tk.call(self.boardImage, "copy", self.images["plain"], "-to", 0, 0, width, height)
+        self.canvas.create_image(0, 0, image = self.boardImage, anchor = NW)
+        # a tile gets an image item of its own the first time it is not plain, 0 means it has none yet
+        self.items = np.zeros((SIZE_X, SIZE_Y), dtype=np.int64)
+        self.canvas.bind(BTN_CLICK, self.onCanvasClick)
+        self.canvas.bind(BTN_FLAG, self.onCanvasRightClick)
+        self.canvas.grid(row = 1, column = 0, columnspan = SIZE_Y) # offset by 1 row for timer
+
+    def setupButtons(self):
+        if self.tiles is not None:
+            return
+        self.tiles = dict({})
         for x in range(0, SIZE_X):
             for y in range(0, SIZE_Y):
                 if y == 0:
@@ -95,25 +142,13 @@ class Minesweeper:
 
                 id = str(x) + "_" + str(y)
 
-                # tile image changeable for debug reasons:
-                gfx = self.images["plain"]
-
-                # currently random amount of mines
-                if (x, y) in mine_indexes:
-                    isMine = True
-                else:
-                    isMine = False
-
                 tile = {
                     "id": id,
-                    "isMine": isMine,
-                    "state": STATE_DEFAULT,
                     "coords": {
                         "x": x,
                         "y": y
                     },
-                    "button": Button(self.frame, image = gfx),
-                    "mines": 0 # calculated after grid is built
+                    "button": Button(self.frame, image = self.images["plain"]),
                 }
 
                 tile["button"].bind(BTN_CLICK, self.onClickWrapper(x, y))
@@ -122,14 +157,6 @@ class Minesweeper:
 
                 self.tiles[x][y] = tile
 
-        # loop again to find nearby mines and display number on tile
-        for x in range(0, SIZE_X):
-            for y in range(0, SIZE_Y):
-                mc = 0
-                for n in self.getNeighbors(x, y):
-                    mc += 1 if n["isMine"] else 0
-                self.tiles[x][y]["mines"] = mc
-
 
     def restart(self):
         self.setup()
@@ -137,25 +164,32 @@ class Minesweeper:
         self.solve_automatically()
 
     def refreshLabels(self):
-        self.labels["flags"].config(text = "Flags: "+str(self.flagCount))
-        self.labels["mines"].config(text = "Mines: "+str(self.mines))
+        self.labels["flags"].config(text = "Flags: "+str(self.engine.flag_count))
+        self.labels["mines"].config(text = "Mines: "+str(self.engine.num_of_mines))
 
     def gameOver(self, won):
-        for x in range(0, SIZE_X):
-            for y in range(0, SIZE_Y):
-                if self.tiles[x][y]["isMine"] == False and self.tiles[x][y]["state"] == STATE_FLAGGED:
-                    self.tiles[x][y]["button"].config(image = self.images["wrong"])
-                if self.tiles[x][y]["isMine"] == True and self.tiles[x][y]["state"] != STATE_FLAGGED:
-                    self.tiles[x][y]["button"].config(image = self.images["mine"])
+        self.flushTiles()
+        wrong_flags = np.nonzero(~self.engine.mines & (self.engine.state == STATE_FLAGGED))
+        missed_mines = np.nonzero(self.engine.mines & (self.engine.state != STATE_FLAGGED))
+        self.drawTiles(*wrong_flags, np.full(len(wrong_flags[0]), TILE_WRONG))
+        self.drawTiles(*missed_mines, np.full(len(missed_mines[0]), TILE_MINE))
 
         self.tk.update()
 
+        # moves still coming for the finished board would be played while the dialog is open
+        self.worker.cancel()
+        self.solverPending = False
+
         msg = "You Win! Play again?" if won else "You Lose! Play again?"
         res = tkMessageBox.askyesno("Game Over", msg)
         if res:
             self.restart()
         else:
-            self.tk.quit()
+            self.quit()
+
+    def quit(self):
+        self.worker.stop()
+        self.tk.quit()
 
     def updateTimer(self):
         ts = "00:00:00"
@@ -165,131 +199,153 @@ class Minesweeper:
             if delta.total_seconds() < 36000:
                 ts = "0" + ts # zero-pad
         self.labels["time"].config(text = ts)
+        self.refreshMoveRate()
         self.frame.after(100, self.updateTimer)
 
-    def getNeighbors(self, x, y):
-        neighbors = []
-        coords = [
-            {"x": x-1,  "y": y-1},  #top right
-            {"x": x-1,  "y": y},    #top middle
-            {"x": x-1,  "y": y+1},  #top left
-            {"x": x,    "y": y-1},  #left
-            {"x": x,    "y": y+1},  #right
-            {"x": x+1,  "y": y-1},  #bottom right
-            {"x": x+1,  "y": y},    #bottom middle
-            {"x": x+1,  "y": y+1},  #bottom left
-        ]
-        for n in coords:
-            try:
-                neighbors.append(self.tiles[n["x"]][n["y"]])
-            except KeyError:
-                pass
-        return neighbors
+    def countMoves(self, moves):
+        self.moveTimes.append((datetime.now(), moves))
+        self.refreshMoveRate()
+
+    def refreshMoveRate(self):
+        # moves per second over the last two seconds
+        now = datetime.now()
+        while self.moveTimes and (now - self.moveTimes[0][0]).total_seconds() > 2:
+            self.moveTimes.popleft()
+        rate = sum(moves for _, moves in self.moveTimes) / 2
+        self.labels["moves"].config(text = "Moves/s: {:.0f}".format(rate))
 
     def onClickWrapper(self, x, y):
-        return lambda Button: self.onClick(self.tiles[x][y])
+        return lambda Button: self.onClick(x, y)
 
     def onRightClickWrapper(self, x, y):
-        return lambda Button: self.onRightClick(self.tiles[x][y])
-
-    def onClick(self, tile):
+        return lambda Button: self.onRightClick(x, y)
+
+    def cellAt(self, event):
+        # rows of the board are x and columns are y, like the button grid
+        x, y = event.y // self.tileSize, event.x // self.tileSize
+        if 0 <= x < SIZE_X and 0 <= y < SIZE_Y:
+            return x, y
+        return None
+
+    def onCanvasClick(self, event):
+        cell = self.cellAt(event)
+        if cell is not None:
+            self.onClick(*cell)
+
+    def onCanvasRightClick(self, event):
+        cell = self.cellAt(event)
+        if cell is not None:
+            self.onRightClick(*cell)
+
+    def applyChanges(self, cells):
+        self.renderTiles(cells)
+        if cells and (self.solverPending or self.autoplayStopped):
+            # the board changed before the moves arrived, they are dropped and asked again for the new board
+            self.solve_automatically()
+
+    def renderTiles(self, cells):
+        # the tiles are drawn once per frame, however many times they changed since the last one
+        self.dirty.update((int(x), int(y)) for x, y in cells)
+        if self.dirty and not self.renderScheduled:
+            self.renderScheduled = True
+            self.frame.after_idle(self.flushTiles)
+
+    def flushTiles(self):
+        self.renderScheduled = False
+        if not self.dirty:
+            return
+        xs, ys = np.array(list(self.dirty)).T
+        self.dirty = set()
+        state = self.engine.state[xs, ys]
+        counts = self.engine.counts[xs, ys]
+        codes = np.where(counts > 0, TILE_NUMBER + counts - 1, TILE_CLICKED)
+        codes = np.where(self.engine.mines[xs, ys], TILE_MINE, codes)
+        codes = np.where(state == STATE_DEFAULT, TILE_PLAIN, codes)
+        codes = np.where(state == STATE_FLAGGED, TILE_FLAG, codes)
+        self.drawTiles(xs, ys, codes)
+
+    def drawTiles(self, xs, ys, codes):
+        # only the tiles whose image is not the one shown already are touched
+        changed = codes != self.shown[xs, ys]
+        for x, y, code in zip(xs[changed].tolist(), ys[changed].tolist(), codes[changed].tolist()):
+            image = self.tileImages[code]
+            if RENDERER != 'canvas':
+                self.tiles[x][y]["button"].config(image = image)
+            elif self.items[x, y] == 0:
+                self.items[x, y] = self.canvas.create_image(
+                    y * self.tileSize, x * self.tileSize, image = image, anchor = NW)
+            else:
+                self.canvas.itemconfigure(int(self.items[x, y]), image = image)
+        self.shown[xs, ys] = codes
+
+    def onClick(self, x, y):
         if self.startTime == None:
             self.startTime = datetime.now()
 
-        if tile["isMine"] == True:
-            # end game
-            self.gameOver(False)
-            return
-
-        # change image
-        if tile["mines"] == 0:
-            tile["button"].config(image = self.images["clicked"])
-            self.clearSurroundingTiles(tile["id"])
+        # clicking on an already clicked number chords it
+        if self.engine.state[x, y] == STATE_CLICKED:
+            changed = self.engine.chord(x, y)
         else:
-            tile["button"].config(image = self.images["numbers"][tile["mines"]-1])
-            self.tile_for_agent[tile['coords']['x']][tile['coords']['y']] = tile["mines"]
-        # if not already set as clicked, change state and count
-        if tile["state"] != STATE_CLICKED:
-            tile["state"] = STATE_CLICKED
-            self.clickedCount += 1
-        if self.clickedCount == (SIZE_X * SIZE_Y) - self.mines:
-            self.gameOver(True)
-
-    def onRightClick(self, tile):
+            changed = self.engine.reveal(x, y)
+        self.applyChanges(changed)
+        if self.engine.game_over:
+            self.gameOver(self.engine.won)
+
+    def onRightClick(self, x, y):
         if self.startTime == None:
             self.startTime = datetime.now()
 
-        # if not clicked
-        if tile["state"] == STATE_DEFAULT:
-            tile["button"].config(image = self.images["flag"])
-            tile["state"] = STATE_FLAGGED
-            tile["button"].unbind(BTN_CLICK)
-            self.tile_for_agent[tile['coords']['x'], tile['coords']['y']] = MINE
-            # if a mine
-            if tile["isMine"] == True:
-                self.correctFlagCount += 1
-            self.flagCount += 1
-            self.refreshLabels()
-        # if flagged, unflag
-        elif tile["state"] == STATE_FLAGGED:
-            tile["button"].config(image = self.images["plain"])
-            tile["state"] = STATE_DEFAULT
-            tile["button"].bind(BTN_CLICK, self.onClickWrapper(tile["coords"]["x"], tile["coords"]["y"]))
-            # if a mine
-            if tile["isMine"] == True:
-                self.correctFlagCount -= 1
-            self.flagCount -= 1
+        changed = self.engine.flag(x, y)
+        if changed:
+            self.applyChanges(changed)
             self.refreshLabels()
 
-    def clearSurroundingTiles(self, id):
-        queue = deque([id])
 
-        while len(queue) != 0:
-            key = queue.popleft()
-            parts = key.split("_")
-            x = int(parts[0])
-            y = int(parts[1])
-            # self.tile_for_agent[x, y] = EMPTY
-            for tile in self.getNeighbors(x, y):
-                self.clearTile(tile, queue)
+    def solve_automatically(self):
+        self.worker.submit(self.gameNumber, self.engine.revealed, NUM_OF_MINES)
+        self.solverPending = True
+        self.autoplayStopped = False
+
+    def pollSolver(self):
+        result = self.worker.poll()
+        if result is not None:
+            self.solverPending = False
+            self.playMoves(result)
+        # poll often enough not to slow down the fast speeds
+        self.frame.after(min(50, max(SPEEDS[self.speed.get()], 1)), self.pollSolver)
+
+    def playMoves(self, result):
+        if self.startTime == None:
+            self.startTime = datetime.now()
 
-    def clearTile(self, tile, queue):
-        if tile["state"] != STATE_DEFAULT:
+        if result.to_clear or result.to_flag:
+            # every certain move of the solve is played in this tick
+            changed = []
+            for x, y in result.to_clear:
+                changed += self.engine.reveal(x, y)
+            for x, y in result.to_flag:
+                changed += self.engine.flag(x, y)
+            moves = len(result.to_clear) + len(result.to_flag)
+            print('cleared {} and flagged {}'.format(len(result.to_clear), len(result.to_flag)))
+        elif result.guess is None:
+            # every unknown cell is flagged and some flags are wrong, there is nothing to play until the board changes
+            print('nothing left to guess, auto solver stopped')
+            self.autoplayStopped = True
             return
-
-        if tile["mines"] == 0:
-            tile["button"].config(image = self.images["clicked"])
-            queue.append(tile["id"])
-            self.tile_for_agent[tile['coords']['x'], tile['coords']['y']] = EMPTY
         else:
-            tile["button"].config(image = self.images["numbers"][tile["mines"]-1])
-            self.tile_for_agent[tile['coords']['x'], tile['coords']['y']] = tile["mines"]
-
-        tile["state"] = STATE_CLICKED
-        self.clickedCount += 1
-
-
-    def solve_automatically(self):
-        # if self.tmp_flag:
-        #     return
-        gs = GraphSolver(MSGrid(grid=self.tile_for_agent))
-        to_clear, to_flag = gs.solve()
-        if to_clear:
-            x, y = to_clear[0]
-            self.onClick(self.tiles[x][y])
-            print('clicked! {},{}'.format(x, y))
-        elif to_flag:
-            x, y = to_flag[0]
-            self.onRightClick(self.tiles[x][y])
-            print('flagged! {},{}'.format(x, y))
-        else:
-            x = np.random.randint(0, SIZE_X - 1)
-            y = np.random.randint(0, SIZE_Y - 1)
-            self.onClick(self.tiles[x][y])
-            print('random! {},{}'.format(x, y))
-        # self.tmp_flag = True 
-        # self.onClick(self.tiles[0][self.t])
-        self.frame.after(1000, self.solve_automatically)
+            # nothing is certain, click the unknown cell least likely to be a mine
+            (x, y), probability = result.guess
+            changed = self.engine.reveal(x, y)
+            moves = 1
+            print('guessed! {},{} ({:.0%} risk)'.format(x, y, probability))
+        self.countMoves(moves)
+        self.applyChanges(changed)
+        self.refreshLabels()
+        if self.engine.game_over:
+            self.gameOver(self.engine.won)
+        if not self.solverPending:
+            # unless the move ended the game and a new one already asked for moves
+            self.frame.after(SPEEDS[self.speed.get()], self.solve_automatically)
 
 
 ### END OF CLASSES ###
@@ -301,6 +357,7 @@ def main():
     window.title("Minesweeper")
     # create game instance
     minesweeper = Minesweeper(window)
+    window.protocol("WM_DELETE_WINDOW", minesweeper.quit)
     # run event loop
     window.mainloop()
 
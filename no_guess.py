@@ -0,0 +1,152 @@
+"""Generates boards that the GraphSolver solves from the first click without a single guess.
+
+usage: python no_guess.py [--boards 100] [--size 16x30] [--mines 99] [--workers 4] [--backend graph]
+"""
+import argparse
+import os
+import time
+import numpy as np
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+from board import count_neighbour_mines, excluded_cells, generate_board, parse_size
+from engine import GameEngine, STATE_CLICKED, STATE_DEFAULT
+from graph_solver import GraphSolver
+from grid import MSGrid
+
+
+def play_without_guessing(mines: np.ndarray, first_click: Tuple[int, int], backend: str = 'graph') -> GameEngine:
+    """plays a board from the first click with every certain move of each solve, until it is won or the solver
+    finds nothing. With the 'graph' backend the outcome only depends on the board, the 'csp' one also solves
+    the components the rules can not, as long as they fit in its time budget.
+
+    Returns:
+        GameEngine: the game where it stopped, engine.won tells whether the board needs no guess
+    """
+    size_x, size_y = mines.shape
+    engine = GameEngine(size_x, size_y, int(np.count_nonzero(mines)), mines=mines)
+    grid = MSGrid(size_x=size_x, size_y=size_y)
+    changed = engine.reveal(*first_click)
+    with GraphSolver(grid, backend=backend) as solver:
+        while changed and not engine.game_over:
+            solver.update(grid.update_cells((cell, engine.revealed[cell]) for cell in changed))
+            to_clear, to_flag = solver.solve()
+            changed = []
+            for x, y in to_clear:
+                changed += engine.reveal(x, y)
+            for x, y in to_flag:
+                changed += engine.flag(x, y)
+    return engine
+
+
+def repair(mines: np.ndarray, engine: GameEngine, excluded: np.ndarray, rng: np.random.Generator) -> bool:
+    """moves one mine of the frontier where the solver got stuck to a random unknown cell away from everything
+    revealed, which changes the numbers around the stuck frontier and keeps the number of mines.
+
+    Returns:
+        bool: False if there is no mine to move or no cell to move it to
+    """
+    clicked = count_neighbour_mines(engine.state == STATE_CLICKED) > 0
+    unknown = engine.state == STATE_DEFAULT
+    # flagged cells were deduced, only the undecided mines of the frontier are moved
+    sources = np.flatnonzero(unknown & clicked & mines)
+    targets = np.flatnonzero(unknown & ~clicked & ~mines & ~excluded)
+    if not len(sources) or not len(targets):
+        return False
+    mines.flat[rng.choice(sources)] = False
+    mines.flat[rng.choice(targets)] = True
+    return True
+
+
+def generate_no_guess_board(size_x: int, size_y: int, num_of_mines: int, seed=None,
+                            first_click: Tuple[int, int] = None, opening: bool = True, backend: str = 'graph',
+                            max_repairs: int = 20, max_attempts: int = 1000) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """draws boards until one is solved without guessing from the first click. A board the solver gets stuck on
+    is repaired locally up to max_repairs times before it is rejected and a new one is drawn.
+
+    Args:
+        size_x (int): number of rows
+        size_y (int): number of columns
+        num_of_mines (int): number of mines
+        seed (optional): a seed or a np.random.Generator. Defaults to None.
+        first_click (Tuple[int, int], optional): the cell the game starts from. Defaults to the centre of the board.
+        opening (bool, optional): the first click is a zero. Defaults to True.
+        backend (str, optional): GraphSolver backend used to solve the boards. Defaults to 'graph'.
+        max_repairs (int, optional): repairs of one board before it is rejected. Defaults to 20.
+        max_attempts (int, optional): boards to draw before giving up. Defaults to 1000.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, Dict]: the mine mask, the neighbour mine counts and the number of
+        boards drawn (attempts) and repairs it took
+    """
+    rng = np.random.default_rng(seed)
+    first_click = first_click if first_click is not None else (size_x // 2, size_y // 2)
+    excluded = excluded_cells(size_x, size_y, first_click, opening)
+    repairs = 0
+    for attempt in range(1, max_attempts + 1):
+        mines, _ = generate_board(size_x, size_y, num_of_mines, rng, first_click, opening)
+        for _ in range(max_repairs + 1):
+            engine = play_without_guessing(mines, first_click, backend)
+            if engine.won:
+                return mines, engine.counts, {'attempts': attempt, 'repairs': repairs}
+            if not repair(mines, engine, excluded, rng):
+                break
+            repairs += 1
+    raise RuntimeError('no board without guesses found in {} attempts'.format(max_attempts))
+
+
+def generate_no_guess_board_star(arguments: Tuple) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    return generate_no_guess_board(*arguments)
+
+
+def generate_no_guess_boards(num_boards: int, size_x: int, size_y: int, num_of_mines: int, seed: int = None,
+                             first_click: Tuple[int, int] = None, opening: bool = True, backend: str = 'graph',
+                             max_repairs: int = 20, workers: int = 1) -> Tuple[np.ndarray, np.ndarray, List[Dict]]:
+    """generates a stack of no guess boards, see generate_no_guess_board, optionally across a process pool.
+    Every board gets its own seed spawned from the given one, so the boards do not depend on the number of workers.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[Dict]]: (num_boards, size_x, size_y) mine masks and counts, and the
+        attempts and repairs of every board
+    """
+    seeds = np.random.SeedSequence(seed).spawn(num_boards)
+    jobs = [(size_x, size_y, num_of_mines, board_seed, first_click, opening, backend, max_repairs) for board_seed in seeds]
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(generate_no_guess_board_star, jobs)
+    else:
+        results = [generate_no_guess_board_star(job) for job in jobs]
+    mines, counts, stats = zip(*results)
+    return np.stack(mines), np.stack(counts), list(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boards', type=int, default=100)
+    parser.add_argument('--size', type=parse_size, default=(16, 30), help='board size as XxY, e.g. 16x30')
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='size of the process pool')
+    parser.add_argument('--backend', choices=['graph', 'array', 'linear', 'csp'], default='graph')
+    parser.add_argument('--max-repairs', type=int, default=20, help='repairs of a board before it is rejected')
+    parser.add_argument('--output', help='.npz file to save the mine masks of the boards to')
+    args = parser.parse_args()
+
+    size_x, size_y = args.size
+    start = time.perf_counter()
+    mines, _, stats = generate_no_guess_boards(
+        args.boards, size_x, size_y, args.mines, args.seed, backend=args.backend, max_repairs=args.max_repairs,
+        workers=args.workers)
+    wall_time = time.perf_counter() - start
+    attempts = sum(board['attempts'] for board in stats)
+    repairs = sum(board['repairs'] for board in stats)
+    print('{} boards of {}x{} with {} mines, {} backend, {} workers, {:.1f} s'.format(
+        args.boards, size_x, size_y, args.mines, args.backend, args.workers, wall_time))
+    print('boards per second:  {:.2f}'.format(args.boards / wall_time))
+    print('attempts per board: {:.2f} ({:.1%} rejected)'.format(attempts / args.boards, 1 - args.boards / attempts))
+    print('repairs per board:  {:.2f}'.format(repairs / args.boards))
+    if args.output:
+        np.savez_compressed(args.output, mines=mines)
+
+
+if __name__ == "__main__":
+    main()
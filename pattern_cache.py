@@ -0,0 +1,208 @@
+"""Memoized deductions of small frontier windows.
+
+usage: python pattern_cache.py [--games 200] [--size 16x30] [--mines 99] [--output patterns.npz]
+"""
+import argparse
+import numpy as np
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+from board import parse_size
+from csp_solver import CSPSolver
+from graph import Graph, IDFactory, Node, Value
+from grid import MSGrid
+
+# codes of the cells of an encoded window, numbers are their own code
+CODE_UNKNOWN = 9
+CODE_FLAG = 10
+CODE_WALL = 11
+# a known cell on the ring of the window, its number is not used since some of its neighbours are outside
+CODE_KNOWN = 12
+
+# deductions of a window, per cell
+DEDUCED_NOTHING = 0
+DEDUCED_SAFE = 1
+DEDUCED_MINE = 2
+
+
+class PatternCache:
+    """LRU table from the canonical encoding of a square window of the grid to the cells it proves safe or mined.
+
+    Only the numbers that are not on the ring of the window are used as constraints, all of their neighbours are
+    inside the window so its deductions hold whatever is outside of it. The cells outside of the board are walls.
+    A window and its 7 rotations and reflections are the same pattern: the smallest of their encodings is the key
+    and the deductions are stored in that orientation, so a 1-2-1 against a wall is one entry whatever the side.
+    """
+    def __init__(self, capacity: int = 100000, size: int = 5) -> None:
+        """
+        Args:
+            capacity (int, optional): entries kept before the least recently used ones are evicted. Defaults to 100000.
+            size (int, optional): side of the windows, at least 3. Defaults to 5.
+        """
+        assert size >= 3, 'a window needs at least one cell that is not on its ring'
+        self.capacity = capacity
+        self.size = size
+        self.table: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.csp = CSPSolver()
+        # the flat index permutations of the 8 symmetries of the square
+        index = np.arange(size * size).reshape(size, size)
+        self.symmetries = np.array([
+            np.rot90(view, k).ravel() for view in (index, index.T) for k in range(4)
+        ])
+        self.ring = np.ones((size, size), dtype=bool)
+        self.ring[1:-1, 1:-1] = False
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def encode(self, grid: MSGrid, centres: np.ndarray) -> np.ndarray:
+        """the windows of the grid centred on the given cells, cells outside of the board are walls
+
+        Returns:
+            np.ndarray: (len(centres), size * size) array of cell codes
+        """
+        half = self.size // 2
+        codes = np.where(grid.grid == MSGrid.UKNOWN_CONSTANT, CODE_UNKNOWN,
+                         np.where(grid.grid == MSGrid.MINE, CODE_FLAG, grid.grid)).astype(np.int8)
+        padded = np.pad(codes, half, constant_values=CODE_WALL)
+        offsets = np.arange(self.size)
+        xs = centres[:, 0, None, None] + offsets[None, :, None]
+        ys = centres[:, 1, None, None] + offsets[None, None, :]
+        windows = padded[xs, ys].reshape(len(centres), -1)
+        ring = windows[:, self.ring.ravel()]
+        windows[:, self.ring.ravel()] = np.where(ring < CODE_UNKNOWN, CODE_KNOWN, ring)
+        return windows
+
+    def canonical(self, windows: np.ndarray) -> Tuple[List[tuple], np.ndarray]:
+        """the keys of a batch of windows and, for each, the permutation from its canonical orientation back to it.
+        The codes fit in 4 bits, the 8 orientations of a window are packed 16 cells per 64 bit word and the
+        lexicographically smallest one is the canonical one.
+        """
+        views = windows[:, self.symmetries].astype(np.uint64)
+        num_words = -(-views.shape[2] // 16)
+        views = np.pad(views, [(0, 0), (0, 0), (0, num_words * 16 - views.shape[2])])
+        shifts = np.arange(60, -1, -4, dtype=np.uint64)
+        words = (views.reshape(len(windows), 8, num_words, 16) << shifts).sum(axis=3, dtype=np.uint64)
+        candidates = np.ones((len(windows), 8), dtype=bool)
+        for word in range(num_words):
+            values = np.where(candidates, words[:, :, word], np.iinfo(np.uint64).max)
+            candidates &= values == values.min(axis=1, keepdims=True)
+        best = np.argmax(candidates, axis=1)
+        keys = [tuple(key) for key in words[np.arange(len(windows)), best].tolist()]
+        return keys, self.symmetries[best]
+
+    def solve_window(self, window: np.ndarray) -> np.ndarray:
+        """enumerates the unknown cells around the numbers of the window, see CSPSolver"""
+        ids = IDFactory()
+        graph = Graph(id_factory=ids)
+        unknowns = {}
+        size = self.size
+        window = window.reshape(size, size)
+        for x in range(1, size - 1):
+            for y in range(1, size - 1):
+                if window[x, y] >= CODE_UNKNOWN:
+                    continue
+                neighbours = [(nx, ny) for nx in range(x - 1, x + 2) for ny in range(y - 1, y + 2) if (nx, ny) != (x, y)]
+                flags = sum(1 for cell in neighbours if window[cell] == CODE_FLAG)
+                unknown_neighbours = [cell for cell in neighbours if window[cell] == CODE_UNKNOWN]
+                if not unknown_neighbours:
+                    continue
+                known = Node(id=ids.get_new_id(), value=int(window[x, y]) - flags, location=(x, y))
+                graph.add_vertex(known)
+                for cell in unknown_neighbours:
+                    if cell not in unknowns:
+                        unknowns[cell] = Node(id=ids.get_new_id(), value=Value.Unknown, location=cell)
+                        graph.add_vertex(unknowns[cell])
+                    graph.add_edge(known, unknowns[cell])
+        deductions = np.full((size, size), DEDUCED_NOTHING, dtype=np.int8)
+        if unknowns:
+            solution = self.csp.solve_graph(graph)
+            for location in solution.safe_locations():
+                deductions[location] = DEDUCED_SAFE
+            for location in solution.mine_locations():
+                deductions[location] = DEDUCED_MINE
+        return deductions.ravel()
+
+    def lookup(self, windows: np.ndarray) -> np.ndarray:
+        """the deductions of a batch of windows, from the table for the patterns seen before
+
+        Returns:
+            np.ndarray: (len(windows), size * size) array of DEDUCED_ values, in the orientation of the windows
+        """
+        keys, permutations = self.canonical(windows)
+        canonical_deductions = np.empty(windows.shape, dtype=np.int8)
+        for i, key in enumerate(keys):
+            deductions = self.table.get(key)
+            if deductions is not None:
+                self.hits += 1
+                self.table.move_to_end(key)
+            else:
+                self.misses += 1
+                deductions = self.solve_window(windows[i])[permutations[i]]
+                self.table[key] = deductions
+                if len(self.table) > self.capacity:
+                    self.table.popitem(last=False)
+                    self.evictions += 1
+            canonical_deductions[i] = deductions
+        result = np.empty(windows.shape, dtype=np.int8)
+        np.put_along_axis(result, permutations, canonical_deductions, axis=1)
+        return result
+
+    def deductions(self, grid: MSGrid, centres: Iterable[Tuple[int, int]]) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """the cells proven safe and mined by the windows centred on the given cells
+
+        Returns:
+            Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]: the locations to clear and the locations to flag
+        """
+        centres = np.array(list(centres), dtype=np.int64).reshape(-1, 2)
+        if not len(centres):
+            return [], []
+        deductions = self.lookup(self.encode(grid, centres)).reshape(-1, self.size, self.size)
+        half = self.size // 2
+        results = []
+        for deduced in (DEDUCED_SAFE, DEDUCED_MINE):
+            window, dx, dy = np.nonzero(deductions == deduced)
+            cells = np.stack([centres[window, 0] + dx - half, centres[window, 1] + dy - half], axis=1)
+            results.append(list(dict.fromkeys(map(tuple, cells.tolist()))))
+        return results[0], results[1]
+
+    def save(self, path: str) -> None:
+        """writes the table, from the least to the most recently used pattern, to an .npz file"""
+        keys = np.array(list(self.table), dtype=np.uint64).reshape(len(self.table), -1)
+        values = np.array(list(self.table.values()), dtype=np.int8).reshape(len(self.table), -1)
+        np.savez_compressed(path, size=self.size, keys=keys, values=values)
+
+    @classmethod
+    def load(cls, path: str, capacity: int = 100000) -> 'PatternCache':
+        data = np.load(path)
+        cache = cls(capacity=capacity, size=int(data['size']))
+        for key, value in zip(data['keys'][-capacity:].tolist(), data['values'][-capacity:]):
+            cache.table[tuple(key)] = value
+        return cache
+
+
+def main():
+    # imported here since the simulation imports graph_solver, which imports this module
+    from simulate import play_game
+
+    parser = argparse.ArgumentParser(description='precomputes a pattern table by playing seeded games')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--size', type=parse_size, default=(16, 30), help='board size as XxY, e.g. 16x30')
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--capacity', type=int, default=100000)
+    parser.add_argument('--output', default='patterns.npz')
+    args = parser.parse_args()
+
+    cache = PatternCache(capacity=args.capacity)
+    for seed in range(args.games):
+        play_game(*args.size, args.mines, seed, backend='graph', pattern_cache=cache)
+    cache.save(args.output)
+    print('{} patterns, {:.1%} hit rate, saved to {}'.format(len(cache.table), cache.hit_rate, args.output))
+
+
+if __name__ == "__main__":
+    main()
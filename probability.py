@@ -0,0 +1,123 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from csp_solver import ComponentSolution
+from grid import MSGrid
+
+
+def log_binomials(n: int, k_max: int) -> np.ndarray:
+    """log(C(n, k)) for k = 0..k_max, -inf where k > n"""
+    k = np.arange(1, k_max + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        steps = np.log(np.maximum(n - k + 1, 0)) - np.log(k)
+    return np.concatenate([[0.0], np.cumsum(steps)])
+
+
+def convolve(a: Tuple[np.ndarray, float], b: Tuple[np.ndarray, float]) -> Tuple[np.ndarray, float]:
+    """convolution of two scaled distributions, each given as (values, log of their scale),
+    the result is rescaled so that the counts of large boards do not overflow.
+    """
+    values = np.convolve(a[0], b[0])
+    peak = values.max()
+    return values / peak, a[1] + b[1] + np.log(peak)
+
+
+def scaled_distribution(solution: ComponentSolution) -> Tuple[np.ndarray, float]:
+    """number of solutions of a component per number of mines, as a scaled distribution"""
+    values = np.zeros(max(solution.solutions_by_mines) + 1)
+    for mines, count in solution.solutions_by_mines.items():
+        values[mines] = count
+    peak = values.max()
+    return values / peak, np.log(peak)
+
+
+def mine_probabilities(
+    grid: MSGrid,
+    solutions: List[ComponentSolution],
+    num_of_mines: int,
+    estimates: Dict[Tuple[int, int], float] = None,
+) -> np.ndarray:
+    """Probability of every cell of the grid being a mine, given the consistent assignments of each frontier component
+    and the total number of mines.
+
+    The unknown cells that are not next to a number (the interior) are unconstrained, so a combination of component
+    assignments using t mines in total can be completed in C(interior, remaining - t) ways. Each assignment of a
+    component is weighted by the number of ways the other components and the interior can complete it.
+    Everything is done in log space since those numbers get huge on large boards.
+
+    Args:
+        grid (MSGrid): the agent's view of the board, flagged cells are assumed to be mines
+        solutions (List[ComponentSolution]): the enumerated assignments of the frontier components
+        num_of_mines (int): the number of mines on the whole board
+        estimates (Dict[Tuple[int, int], float], optional): fixed probabilities for the cells of components that could
+            not be enumerated, their expected mines are taken out of the remaining ones. Defaults to None.
+
+    Returns:
+        np.ndarray: array of the size of the grid, 0 for revealed cells and 1 for flagged ones
+    """
+    estimates = {} if estimates is None else estimates
+    probabilities = np.zeros((grid.size_x, grid.size_y))
+    probabilities[grid.grid == MSGrid.MINE] = 1.0
+    for location, probability in estimates.items():
+        probabilities[location] = probability
+
+    solutions = [solution for solution in solutions if solution.num_solutions]
+    interior = grid.grid == grid.unknown_constant
+    for solution in solutions:
+        for location in solution.locations:
+            interior[location] = False
+    for location in estimates:
+        interior[location] = False
+    num_interior = int(np.count_nonzero(interior))
+    remaining = num_of_mines - int(np.count_nonzero(grid.grid == MSGrid.MINE)) - int(round(sum(estimates.values())))
+    remaining = max(remaining, 0)
+    log_ways = log_binomials(num_interior, remaining)
+
+    def log_completions(distribution: Tuple[np.ndarray, float], mines: int) -> float:
+        """log of the number of ways the given distribution of frontier mines plus the interior complete `mines` mines"""
+        values, scale = distribution
+        taken = mines + np.arange(len(values))
+        valid = (taken <= remaining) & (values > 0)
+        if not valid.any():
+            return -np.inf
+        terms = np.log(values[valid]) + log_ways[remaining - taken[valid]]
+        peak = terms.max()
+        if peak == -np.inf:
+            return -np.inf
+        return scale + peak + np.log(np.exp(terms - peak).sum())
+
+    distributions = [scaled_distribution(solution) for solution in solutions]
+    # prefixes[j] is the distribution of the components before j and suffixes[j] the one of j and after
+    empty = (np.ones(1), 0.0)
+    prefixes = [empty]
+    for distribution in distributions:
+        prefixes.append(convolve(prefixes[-1], distribution))
+    suffixes = [empty]
+    for distribution in reversed(distributions):
+        suffixes.append(convolve(distribution, suffixes[-1]))
+    suffixes.reverse()
+
+    for j, solution in enumerate(solutions):
+        others = convolve(prefixes[j], suffixes[j + 1])
+        mines = sorted(solution.solutions_by_mines)
+        log_weights = np.array([log_completions(others, k) for k in mines])
+        if np.all(log_weights == -np.inf):
+            # inconsistent with the mine count (e.g. a wrong flag), fall back to the component alone
+            log_weights = np.zeros(len(mines))
+        weights = np.exp(log_weights - log_weights.max())
+        total = sum(weight * solution.solutions_by_mines[k] for weight, k in zip(weights, mines))
+        cell_weights = sum(weight * solution.mine_counts_by_mines[k] for weight, k in zip(weights, mines))
+        for location, probability in zip(solution.locations, cell_weights / total):
+            probabilities[location] = probability
+
+    if num_interior:
+        values, _ = prefixes[-1]
+        frontier_mines = np.arange(len(values))
+        valid = (frontier_mines <= remaining) & (values > 0)
+        if valid.any():
+            log_weights = np.log(values[valid]) + log_ways[remaining - frontier_mines[valid]]
+            weights = np.exp(log_weights - log_weights.max())
+            expected = (weights * (remaining - frontier_mines[valid])).sum() / weights.sum()
+        else:
+            expected = remaining
+        probabilities[interior] = min(expected / num_interior, 1.0)
+    return probabilities
@@ -0,0 +1,88 @@
+import numpy as np
+from typing import List, Tuple
+
+
+def neighbour_pairs(mask: np.ndarray, across: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """flat indices of every pair of 8-connected cells that are both set in the mask, each pair once.
+    With across, only the pairs with one cell in across and the other one outside of it.
+    """
+    size_x, size_y = mask.shape
+    index = np.arange(size_x * size_y).reshape(size_x, size_y)
+    firsts = []
+    seconds = []
+    # below, right and both diagonals, the other directions are the same pairs seen from the other side
+    for a, b in (
+        ((slice(1, None), slice(None)), (slice(None, -1), slice(None))),
+        ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+        ((slice(1, None), slice(1, None)), (slice(None, -1), slice(None, -1))),
+        ((slice(1, None), slice(None, -1)), (slice(None, -1), slice(1, None))),
+    ):
+        both = mask[a] & mask[b]
+        if across is not None:
+            both &= across[a] != across[b]
+        firsts.append(index[a][both])
+        seconds.append(index[b][both])
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def label_regions(mask: np.ndarray, across: np.ndarray = None) -> Tuple[np.ndarray, int]:
+    """labels the 8-connected regions of a boolean mask without recursion or a per cell loop.
+    Every pair of neighbouring cells hooks the larger of their roots under the smaller one, then the
+    labels are shortcut to their roots (pointer jumping) until every pair agrees, which takes a number
+    of rounds logarithmic in the size of the regions.
+
+    Args:
+        mask (np.ndarray): 2-D boolean array
+        across (np.ndarray, optional): 2-D boolean array, when given two neighbouring cells of the mask are only
+            connected if one of them is in across and the other one is not, e.g. the known and unknown cells of the
+            frontier. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray, int]: int32 array of the shape of the mask with 0 outside the mask and 1..n inside,
+        numbered in row major order of the first cell of each region, and the number of regions n
+    """
+    firsts, seconds = neighbour_pairs(mask, across)
+    parents = np.arange(mask.size)
+    while True:
+        first_roots = parents[firsts]
+        second_roots = parents[seconds]
+        differ = first_roots != second_roots
+        if not differ.any():
+            break
+        np.minimum.at(parents, np.maximum(first_roots[differ], second_roots[differ]),
+                      np.minimum(first_roots[differ], second_roots[differ]))
+        while True:
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
+
+    roots = parents[mask.ravel()]
+    unique_roots, labels = np.unique(roots, return_inverse=True)
+    label_array = np.zeros(mask.shape, dtype=np.int32)
+    label_array[mask] = labels + 1
+    return label_array, len(unique_roots)
+
+
+def region_indices(labels: np.ndarray, num_regions: int) -> List[np.ndarray]:
+    """flat indices of the cells of every region of a label array, in row major order, see label_regions.
+    Use np.unravel_index or divmod by the number of columns to get the cells back.
+    """
+    if not num_regions:
+        return []
+    flat = labels.ravel()
+    # a stable sort by label keeps the cells of each region in row major order
+    order = np.argsort(flat, kind='stable')
+    ends = np.cumsum(np.bincount(flat, minlength=num_regions + 1))
+    return np.split(order[ends[0]:], ends[1:-1] - ends[0])
+
+
+def label_components(mask: np.ndarray, across: np.ndarray = None) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """label_regions and the flat indices of the cells of every region.
+
+    Returns:
+        Tuple[np.ndarray, List[np.ndarray]]: the int32 label array and, for the region labelled i + 1, the
+        int64 flat indices of its cells at position i
+    """
+    labels, num_regions = label_regions(mask, across)
+    return labels, region_indices(labels, num_regions)
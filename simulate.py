@@ -0,0 +1,123 @@
+"""Plays seeded games headlessly with the GraphSolver to measure how well it plays.
+
+usage: python simulate.py [--games 100] [--size 16x30] [--mines 99] [--workers 4] [--backend csp] [--solver-workers 0]
+                          [--pattern-cache patterns.npz]
+"""
+import argparse
+import os
+import time
+import numpy as np
+from multiprocessing import Pool
+from typing import Dict, Tuple
+from board import parse_size
+from engine import GameEngine, STATE_DEFAULT
+from graph_solver import GraphSolver
+from grid import MSGrid
+from pattern_cache import PatternCache
+
+# the pattern cache of this process, loaded once by load_pattern_cache and shared by the games it plays
+worker_pattern_cache = None
+
+
+def play_game(size_x: int, size_y: int, num_of_mines: int, seed: int, backend: str = 'csp',
+              time_budget: float = 0.2, first_click: str = None, solver_workers: int = 0,
+              pattern_cache: PatternCache = None) -> Dict:
+    """plays one game the way the auto solver of the UI does: every certain move of a solve at once, and the cell
+    least likely to be a mine when there are none.
+
+    Returns:
+        Dict: the seed, whether the game was won, the number of moves (cells cleared, flagged or guessed), solves
+        and guesses, the number of cells the LinearSolver deduced beyond the rules of the graphs, and the latency
+        of every solve
+    """
+    engine = GameEngine(size_x, size_y, num_of_mines, seed=seed, first_click=first_click)
+    grid = MSGrid(size_x=size_x, size_y=size_y)
+    changed = []
+    moves = 0
+    guesses = 0
+    latencies = []
+    with GraphSolver(grid, backend=backend, time_budget=time_budget, pattern_cache=pattern_cache,
+                     workers=solver_workers) as solver:
+        while not engine.game_over:
+            start = time.perf_counter()
+            solver.update(grid.update_cells((cell, engine.revealed[cell]) for cell in changed))
+            to_clear, to_flag = solver.solve()
+            if not to_clear and not to_flag:
+                probabilities = solver.mine_probabilities(num_of_mines)
+                probabilities[engine.state != STATE_DEFAULT] = np.inf
+                to_clear = [np.unravel_index(np.argmin(probabilities), probabilities.shape)]
+                guesses += 1
+            latencies.append(time.perf_counter() - start)
+            changed = []
+            for x, y in to_clear:
+                changed += engine.reveal(x, y)
+            for x, y in to_flag:
+                changed += engine.flag(x, y)
+            moves += len(to_clear) + len(to_flag)
+    return {'seed': seed, 'won': engine.won, 'moves': moves, 'solves': len(latencies), 'guesses': guesses,
+            'linear_deductions': solver.linear_deductions, 'latencies': latencies}
+
+
+def load_pattern_cache(path: str = None) -> None:
+    """initializer of the workers of the pool, every worker loads its own copy of the table"""
+    global worker_pattern_cache
+    worker_pattern_cache = PatternCache.load(path) if path else None
+
+
+def play_game_star(arguments: Tuple) -> Dict:
+    return play_game(*arguments, pattern_cache=worker_pattern_cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--size', type=parse_size, default=(16, 30), help='board size as XxY, e.g. 16x30')
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game, the others follow it')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='size of the process pool')
+    parser.add_argument('--backend', choices=['graph', 'array', 'linear', 'csp'], default='csp')
+    parser.add_argument('--time-budget', type=float, default=0.2,
+                        help='seconds the exact solver may spend per move before giving up')
+    parser.add_argument('--first-click', choices=['safe', 'opening'],
+                        help='place the mines on the first click so that it is safe, or opens a region')
+    parser.add_argument('--solver-workers', type=int, default=0,
+                        help='process pool of each solver for its large components, the games are then played one '
+                             'after the other since the workers of a pool can not start pools of their own')
+    parser.add_argument('--pattern-cache', metavar='PATH',
+                        help='pattern table saved by pattern_cache.py, tried with the rules of the graphs')
+    args = parser.parse_args()
+
+    size_x, size_y = args.size
+    jobs = [(size_x, size_y, args.mines, seed, args.backend, args.time_budget, args.first_click, args.solver_workers)
+            for seed in range(args.seed, args.seed + args.games)]
+    start = time.perf_counter()
+    if args.solver_workers:
+        load_pattern_cache(args.pattern_cache)
+        results = [play_game_star(job) for job in jobs]
+    else:
+        with Pool(args.workers, initializer=load_pattern_cache, initargs=(args.pattern_cache,)) as pool:
+            # the games take very different times, so hand them out one by one
+            results = list(pool.imap_unordered(play_game_star, jobs))
+    wall_time = time.perf_counter() - start
+
+    wins = sum(result['won'] for result in results)
+    moves = sum(result['moves'] for result in results)
+    solves = sum(result['solves'] for result in results)
+    guesses = sum(result['guesses'] for result in results)
+    linear_deductions = sum(result['linear_deductions'] for result in results)
+    latencies = np.concatenate([result['latencies'] for result in results]) * 1e3
+    print('{} games of {}x{} with {} mines, {} backend, {} workers, {} solver workers, {:.1f} s'.format(
+        args.games, size_x, size_y, args.mines, args.backend, 1 if args.solver_workers else args.workers,
+        args.solver_workers, wall_time))
+    print('win rate:          {:.1%} ({}/{})'.format(wins / args.games, wins, args.games))
+    print('guesses per game:  {:.2f}'.format(guesses / args.games))
+    print('moves per game:    {:.1f} in {:.1f} solves'.format(moves / args.games, solves / args.games))
+    if args.backend in ('linear', 'csp'):
+        print('linear deductions: {:.1f} per game beyond the graph rules'.format(linear_deductions / args.games))
+    print('moves per second:  {:.0f}'.format(moves / wall_time))
+    print('solve latency (ms): p50 {:.2f} | p90 {:.2f} | p99 {:.2f} | max {:.2f}'.format(
+        *np.percentile(latencies, [50, 90, 99]), latencies.max()))
+
+
+if __name__ == "__main__":
+    main()
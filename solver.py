@@ -1,64 +1,57 @@
-import numpy as np 
-
-UNKNOWN = -2
-MINE = -1
-EMPTY = 0
-
-
-def check_neighborhood(field, x, y):
-    left = x-1 if x > 0 else None
-    right = x + 1 if x < field.shape[1] - 1 else None
-    down = y + 1 if y < field.shape[1] - 1 else None 
-    up = y - 1 if y > 0 else None 
-    mines = 0
-    unsolved = False 
-    unknown_neighbors= []
-    total = 0
-    for xx in [left, x, right]:
-        if xx is None:
-            continue
-        for yy in [up, y, down]:
-            if yy is None:
-                continue
-            total += 1
-            if field[xx, yy] == MINE:
-                mines += 1
-            if field[xx, yy] == UNKNOWN:
-                unsolved = True
-                unknown_neighbors.append((xx, yy))
-    return mines, unsolved, unknown_neighbors, total
-
-
-
-
-def relax(field):
-    to_clear = []
-    to_flag = []
-    # relaxed_field = np.copy(field)
-    for i in range(field.shape[0]):
-        for j in range(field.shape[1]):
-            if field[i, j] != UNKNOWN:
-                if field[i, j] != EMPTY:
-                    if field[i, j] != MINE:
-                        mines, unsolved, unknown_neighbours, _ = check_neighborhood(field, i, j)
-                        if not unsolved:
-                            continue
-                        # relaxed_field[i, j] = field[i, j] - mines 
-                        if mines == field[i, j]:
-                            to_clear += unknown_neighbours
-                        if len(unknown_neighbours) == field[i, j] - mines:
-                            to_flag += unknown_neighbours
-                        print('i: {} | j: {} | mines: {} | unsolved: {}| val: {}'.format(
-                            i, j, mines ,len(unknown_neighbours), field[i, j]))
-    return None, to_clear, to_flag
-
-
-
-def solve(field):
-    print(field)
+import numpy as np
+from typing import List, Tuple
+from board import count_neighbour_mines
+from grid import MSGrid
+
+# same constants as the grid the agent sees, so that the rules can run on MSGrid.grid before the graph solver
+UNKNOWN = MSGrid.UKNOWN_CONSTANT
+MINE = MSGrid.MINE
+EMPTY = MSGrid.EMPTY
+
+
+def relax(field: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """applies the two single cell rules to every number of the field at once:
+    a number whose flagged neighbours add up to it clears its other unknown neighbours, and a number whose
+    unknown neighbours are exactly the mines it is still missing flags all of them.
+
+    Args:
+        field (np.ndarray): the agent's view of the board, using the MSGrid constants. Every operation is
+            element wise over the last two axes, so a stack of boards (N, X, Y) is relaxed as well.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the relaxed field (every number minus its flagged neighbours),
+        the mask of the cells to clear and the mask of the cells to flag
+    """
+    unknown = field == UNKNOWN
+    numbers = field >= EMPTY
+    unknown_neighbours = count_neighbour_mines(unknown)
+    missing = field - count_neighbour_mines(field == MINE)
+    # only numbers next to an unknown cell can tell anything new
+    unsolved = numbers & (unknown_neighbours > 0)
+    to_clear = unknown & (count_neighbour_mines(unsolved & (missing == 0)) > 0)
+    to_flag = unknown & (count_neighbour_mines(unsolved & (missing == unknown_neighbours)) > 0)
+    relaxed_field = np.where(numbers, missing, field)
+    return relaxed_field, to_clear, to_flag
+
+
+def relax_batch(boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """the single cell rules and the boundary detection of MSGrid for many boards of the same size at once,
+    e.g. to evaluate a strategy over a corpus of positions without building an MSGrid and a GraphSolver per board.
+
+    Args:
+        boards (np.ndarray): (N, X, Y) array of boards, using the MSGrid constants
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (N, X, Y) boolean masks of the cells to clear, the cells to
+        flag and the boundary cells of every board
+    """
+    assert boards.ndim == 3, 'boards should be stacked as an (N, X, Y) array!'
+    _, to_clear, to_flag = relax(boards)
+    return to_clear, to_flag, MSGrid.boundary_mask(boards == UNKNOWN)
+
+
+def solve(field: np.ndarray) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
     field, to_clear, to_flag = relax(field)
-    if to_clear or to_flag:
-        return to_clear, to_flag
-    return None, None 
-
-
+    if to_clear.any() or to_flag.any():
+        return [tuple(cell) for cell in np.argwhere(to_clear).tolist()], [tuple(cell) for cell in np.argwhere(to_flag).tolist()]
+    return None, None
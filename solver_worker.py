@@ -0,0 +1,115 @@
+import queue
+import threading
+import numpy as np
+from typing import List, NamedTuple, Optional, Tuple
+from graph_solver import GraphSolver
+from grid import MSGrid
+
+
+class SolveRequest(NamedTuple):
+    game: int
+    generation: int
+    revealed: np.ndarray
+    num_of_mines: int
+
+
+class SolveResult(NamedTuple):
+    generation: int
+    to_clear: List[Tuple[int, int]]
+    to_flag: List[Tuple[int, int]]
+    # the cell least likely to be a mine and that probability, when nothing is certain. None if there is no cell
+    # left to guess, e.g. every unknown cell is flagged but some flags are wrong
+    guess: Optional[Tuple[Tuple[int, int], float]]
+
+
+class SolverWorker:
+    """Runs a GraphSolver in a background thread so that the UI never waits for it.
+    The UI submits snapshots of the board and polls for the moves (e.g. with Tk's after), the worker keeps its own
+    MSGrid and GraphSolver and updates them with the cells that differ from the previous snapshot.
+    Every submit or cancel starts a new generation, work and results of older generations are dropped, so a move
+    computed for a board that has changed since is never played.
+    """
+    def __init__(self, backend: str = 'csp', time_budget: float = 0.2) -> None:
+        self.backend = backend
+        self.time_budget = time_budget
+        self.requests: queue.Queue = queue.Queue()
+        self.results: queue.Queue = queue.Queue()
+        # the newest generation, written by the UI thread and read by the worker to drop outdated work
+        self.generation = 0
+        self.game = None
+        self.grid = None
+        self.solver = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, game: int, revealed: np.ndarray, num_of_mines: int) -> int:
+        """
+        Args:
+            game (int): number of the game, a different one makes the worker start over with a new solver
+            revealed (np.ndarray): the agent's view of the board using the MSGrid constants, it is copied
+            num_of_mines (int): the number of mines on the board, for the guesses
+
+        Returns:
+            int: the generation of the request
+        """
+        self.generation += 1
+        self.requests.put(SolveRequest(game, self.generation, revealed.copy(), num_of_mines))
+        return self.generation
+
+    def cancel(self) -> None:
+        """drops the pending requests and results, e.g. because the board has changed"""
+        self.generation += 1
+
+    def poll(self) -> Optional[SolveResult]:
+        """the result of the latest request if it has arrived, without blocking"""
+        result = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                return result
+            if latest.generation == self.generation:
+                result = latest
+
+    def stop(self) -> None:
+        """stops the thread once it is done with the request it is solving, and closes the solver"""
+        self.requests.put(None)
+        self.thread.join()
+
+    def run(self) -> None:
+        while True:
+            request = self.requests.get()
+            # only the newest snapshot matters, the ones queued before it are skipped
+            while request is not None and not self.requests.empty():
+                request = self.requests.get_nowait()
+            if request is None:
+                if self.solver is not None:
+                    self.solver.close()
+                return
+            if request.generation != self.generation:
+                continue
+            result = self.solve(request)
+            if result is not None:
+                self.results.put(result)
+
+    def solve(self, request: SolveRequest) -> Optional[SolveResult]:
+        if request.game != self.game:
+            self.game = request.game
+            if self.solver is not None:
+                self.solver.close()
+            self.grid = MSGrid(size_x=request.revealed.shape[0], size_y=request.revealed.shape[1])
+            self.solver = GraphSolver(self.grid, backend=self.backend, time_budget=self.time_budget)
+        changed = [(int(x), int(y)) for x, y in np.argwhere(request.revealed != self.grid.grid)]
+        self.solver.update(self.grid.update_cells((cell, request.revealed[cell]) for cell in changed))
+        to_clear, to_flag = self.solver.solve()
+        guess = None
+        if not to_clear and not to_flag:
+            if request.generation != self.generation:
+                # the board changed while solving, the guess would be thrown away
+                return None
+            probabilities = self.solver.mine_probabilities(request.num_of_mines)
+            probabilities[request.revealed != MSGrid.UKNOWN_CONSTANT] = np.inf
+            x, y = np.unravel_index(np.argmin(probabilities), probabilities.shape)
+            if np.isfinite(probabilities[x, y]):
+                guess = (int(x), int(y)), float(probabilities[x, y])
+        return SolveResult(request.generation, to_clear, to_flag, guess)
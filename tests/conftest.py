@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# the modules of the game are at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import count_neighbour_mines  # noqa: E402
+from engine import GameEngine, STATE_CLICKED, STATE_DEFAULT, STATE_FLAGGED  # noqa: E402
+
+
+@pytest.fixture
+def played_board():
+    def play(size_x: int, size_y: int, num_of_mines: int, seed: int, revealed: float = 0.4,
+             flagged: float = 0.5) -> GameEngine:
+        """reveals random safe cells of a seeded game and flags some of the mines next to them"""
+        engine = GameEngine(size_x, size_y, num_of_mines, seed=seed)
+        safe_cells = np.argwhere(~engine.mines)
+        engine.rng.shuffle(safe_cells)
+        for x, y in safe_cells[:int(revealed * len(safe_cells))]:
+            engine.reveal(x, y)
+        frontier = np.argwhere(engine.mines & (count_neighbour_mines(engine.state == STATE_CLICKED) > 0))
+        for x, y in frontier[engine.rng.random(len(frontier)) < flagged]:
+            engine.flag(x, y)
+        return engine
+    return play
+
+
+@pytest.fixture
+def random_moves():
+    def moves(engine: GameEngine, steps: int, seed: int, wrong_flags: bool = True):
+        """plays random safe reveals, flags and unflags, yields the changed cells of every move. Without wrong_flags
+        only mines are flagged, so that the numbers never contradict the flags.
+        """
+        rng = np.random.default_rng(seed)
+        for _ in range(steps):
+            if engine.game_over:
+                return
+            default = np.argwhere((engine.state == STATE_DEFAULT) & (wrong_flags | engine.mines))
+            flagged = np.argwhere(engine.state == STATE_FLAGGED)
+            safe = np.argwhere((engine.state == STATE_DEFAULT) & ~engine.mines)
+            move = rng.random()
+            # when the safe cells left are all (wrongly) flagged, the only way on is to unflag
+            if (move < 0.2 or not len(safe)) and len(flagged):
+                changed = engine.flag(*flagged[rng.integers(len(flagged))])
+            elif move < 0.45 and len(default):
+                changed = engine.flag(*default[rng.integers(len(default))])
+            else:
+                changed = engine.reveal(*safe[rng.integers(len(safe))])
+            yield changed
+    return moves
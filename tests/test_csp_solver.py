@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from csp_solver import CSPSolver
+from graph_solver import GraphSolver
+from grid import MSGrid
+
+
+def brute_force(grid: MSGrid, locations):
+    """every mine assignment of the cells that satisfies the numbers around them, one row per assignment"""
+    index = {cell: i for i, cell in enumerate(locations)}
+    assignments = (np.arange(2 ** len(locations))[:, None] >> np.arange(len(locations))) & 1
+    valid = np.ones(len(assignments), dtype=bool)
+    known = {neighbour for cell in locations for neighbour in grid.get_cell_neighbours(cell)
+             if grid.grid[neighbour] >= 0}
+    for cell in known:
+        neighbours = grid.get_cell_neighbours(cell)
+        flags = sum(grid.grid[neighbour] == MSGrid.MINE for neighbour in neighbours)
+        columns = [index[neighbour] for neighbour in neighbours if grid.grid[neighbour] == MSGrid.UKNOWN_CONSTANT]
+        valid &= assignments[:, columns].sum(axis=1) == grid.grid[cell] - flags
+    return assignments[valid]
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_csp_matches_brute_force(played_board, seed):
+    engine = played_board(8, 8, 14, seed, revealed=0.1)
+    grid = MSGrid(grid=engine.revealed.copy())
+    solver = GraphSolver(grid)
+    # the rules add the info nodes the CSPSolver uses as extra constraints
+    solver.solve()
+    checked = 0
+    for graph in solver.graphs:
+        if len(graph.get_unknown_vtxs()) > 16:
+            continue
+        solution = CSPSolver().solve_graph(graph)
+        locations = solution.locations
+        assert sorted(locations) == sorted(vtx.location for vtx in graph.get_unknown_vtxs())
+        assignments = brute_force(grid, locations)
+        mines = assignments.sum(axis=1)
+        assert solution.solutions_by_mines == {int(m): int((mines == m).sum()) for m in np.unique(mines)}
+        for m, counts in solution.mine_counts_by_mines.items():
+            assert np.array_equal(counts, assignments[mines == m].sum(axis=0))
+        assert sorted(solution.safe_locations()) == sorted(
+            locations[i] for i in np.flatnonzero(~assignments.any(axis=0)))
+        assert sorted(solution.mine_locations()) == sorted(
+            locations[i] for i in np.flatnonzero(assignments.all(axis=0)))
+        checked += 1
+    assert checked
@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+from board import count_neighbour_mines
+from engine import GameEngine, STATE_CLICKED, STATE_DEFAULT, STATE_FLAGGED
+from grid import MSGrid
+
+
+def cascade_reference(engine: GameEngine, x: int, y: int):
+    """the cells a click opens, one cell at a time: a zero opens its neighbours that are neither clicked nor flagged"""
+    opened = {(x, y)}
+    queue = [(x, y)]
+    for cx, cy in queue:
+        if engine.counts[cx, cy] != 0:
+            continue
+        for nx in range(max(cx - 1, 0), min(cx + 2, engine.size_x)):
+            for ny in range(max(cy - 1, 0), min(cy + 2, engine.size_y)):
+                if engine.state[nx, ny] == STATE_DEFAULT and (nx, ny) not in opened:
+                    opened.add((nx, ny))
+                    queue.append((nx, ny))
+    return opened
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('wrong_flags', [0, 3, 12])
+def test_reveal_matches_cascade(seed, wrong_flags):
+    engine = GameEngine(16, 30, 40, seed=seed)
+    rng = np.random.default_rng(seed)
+    # wrong flags on zero cells cut the regions, the engine falls back to its flood fill there
+    zeros = np.argwhere(~engine.mines & (engine.counts == 0))
+    for x, y in zeros[rng.permutation(len(zeros))[:wrong_flags]]:
+        engine.flag(x, y)
+    safe = np.argwhere(~engine.mines)
+    for x, y in safe[rng.permutation(len(safe))]:
+        if engine.game_over:
+            break
+        if engine.state[x, y] != STATE_DEFAULT:
+            continue
+        expected = cascade_reference(engine, x, y)
+        changed = engine.reveal(x, y)
+        assert len(changed) == len(expected)
+        assert set(changed) == expected
+        for cell in changed:
+            assert engine.state[cell] == STATE_CLICKED
+            assert engine.revealed[cell] == engine.counts[cell]
+    assert engine.clicked_count == np.count_nonzero(engine.state == STATE_CLICKED)
+    if not wrong_flags:
+        assert engine.won
+
+
+def test_counts():
+    engine = GameEngine(9, 12, 20, seed=0)
+    assert engine.mines.sum() == 20
+    assert np.array_equal(engine.counts, count_neighbour_mines(engine.mines))
+
+
+def test_flag_toggles():
+    engine = GameEngine(9, 9, 10, seed=1)
+    mine = tuple(np.argwhere(engine.mines)[0])
+    safe = tuple(np.argwhere(~engine.mines)[0])
+    assert engine.flag(*mine) == [mine]
+    assert engine.state[mine] == STATE_FLAGGED and engine.revealed[mine] == MSGrid.MINE
+    assert engine.flag(*safe) == [safe]
+    assert (engine.flag_count, engine.correct_flag_count) == (2, 1)
+    # a flagged cell can not be revealed
+    assert engine.reveal(*safe) == []
+    assert engine.flag(*safe) == [safe]
+    assert engine.state[safe] == STATE_DEFAULT and engine.revealed[safe] == MSGrid.UKNOWN_CONSTANT
+    assert engine.flag(*mine) == [mine]
+    assert (engine.flag_count, engine.correct_flag_count) == (0, 0)
+    # a clicked cell can not be flagged
+    engine.reveal(*safe)
+    assert engine.flag(*safe) == []
+
+
+def test_chord():
+    engine = GameEngine(9, 9, 10, seed=2)
+    x, y = np.argwhere(~engine.mines & (engine.counts > 0))[0]
+    neighbours = engine.neighbours(x, y)
+    # not clicked yet
+    assert engine.chord(x, y) == []
+    engine.reveal(x, y)
+    # the flags do not add up to the number yet
+    assert engine.chord(x, y) == []
+    for cell in neighbours:
+        if engine.mines[cell]:
+            engine.flag(*cell)
+    changed = engine.chord(x, y)
+    assert changed
+    assert not engine.exploded
+    for cell in neighbours:
+        assert engine.state[cell] == (STATE_FLAGGED if engine.mines[cell] else STATE_CLICKED)
+    assert all(engine.state[cell] == STATE_CLICKED and not engine.mines[cell] for cell in changed)
+
+
+def test_chord_on_a_wrong_flag_explodes():
+    engine = GameEngine(9, 9, 10, seed=3)
+    x, y = np.argwhere(~engine.mines & (engine.counts == 1))[0]
+    engine.reveal(x, y)
+    neighbours = engine.neighbours(x, y)
+    mine = next(cell for cell in neighbours if engine.mines[cell])
+    wrong = next(cell for cell in neighbours if not engine.mines[cell] and engine.state[cell] == STATE_DEFAULT)
+    engine.flag(*wrong)
+    engine.chord(x, y)
+    assert engine.game_over and not engine.won
+    assert engine.exploded == mine
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('first_click', ['safe', 'opening'])
+def test_first_click(seed, first_click):
+    engine = GameEngine(9, 9, 30, seed=seed, first_click=first_click)
+    # whatever the board drawn before it, the first click moves the mines away
+    x, y = np.argwhere(engine.mines)[0]
+    changed = engine.reveal(x, y)
+    assert not engine.exploded
+    assert not engine.mines[x, y]
+    assert engine.mines.sum() == 30
+    assert np.array_equal(engine.counts, count_neighbour_mines(engine.mines))
+    if first_click == 'opening':
+        assert engine.counts[x, y] == 0
+        assert len(changed) > 1
+    assert set(changed) >= {(x, y)}
+
+
+def test_same_seed_same_games():
+    engines = [GameEngine(16, 30, 99, seed=7, first_click='opening') for _ in range(2)]
+    for engine in engines:
+        engine.reveal(8, 15)
+    assert np.array_equal(engines[0].mines, engines[1].mines)
+    assert np.array_equal(engines[0].revealed, engines[1].revealed)
+    # the next games follow the same sequence as well
+    for engine in engines:
+        engine.reset()
+    assert np.array_equal(engines[0].mines, engines[1].mines)
+    assert not np.array_equal(engines[0].mines, GameEngine(16, 30, 99, seed=8).mines)
+
+
+def test_given_mines():
+    mines = np.zeros((4, 5), dtype=bool)
+    mines[0, 0] = mines[3, 4] = True
+    engine = GameEngine(4, 5, 2, mines=mines)
+    assert np.array_equal(engine.mines, mines)
+    changed = engine.reveal(2, 2)
+    assert engine.won
+    assert set(changed) == set(map(tuple, np.argwhere(~mines)))
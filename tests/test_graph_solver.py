@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from engine import GameEngine, STATE_DEFAULT
+from graph_solver import GraphSolver
+from grid import MSGrid
+from pattern_cache import PatternCache
+
+
+def test_starved_csp_is_retried():
+    """a component the CSPSolver had no time for must not stay cached without deductions, the next solve with
+    enough time finds the same moves as a solver that had the time from the start
+    """
+    engine = GameEngine(16, 30, 99, seed=1)
+    for _ in range(80):
+        if engine.game_over:
+            break
+        # both solvers start from the same grid, an incremental one could order the rows of the LinearSolver
+        # differently and find other (as correct) deductions
+        starved = GraphSolver(MSGrid(grid=engine.revealed.copy()), backend='csp', time_budget=0)
+        starved.solve()
+        starved.time_budget = 5
+        to_clear, to_flag = starved.solve()
+        assert (to_clear, to_flag) == GraphSolver(MSGrid(grid=engine.revealed.copy()), backend='csp',
+                                                  time_budget=5).solve()
+        if to_clear:
+            engine.reveal(*to_clear[0])
+        elif to_flag:
+            engine.flag(*to_flag[0])
+        else:
+            safe = np.argwhere((engine.state == STATE_DEFAULT) & ~engine.mines)
+            engine.reveal(*safe[0])
+
+
+def test_pool_solves_like_inline():
+    engine = GameEngine(16, 30, 99, seed=3, first_click='opening')
+    engine.reveal(8, 15)
+    for _ in range(30):
+        if engine.game_over:
+            break
+        grid = engine.revealed.copy()
+        inline = GraphSolver(MSGrid(grid=grid.copy()), backend='csp', time_budget=5).solve()
+        with GraphSolver(MSGrid(grid=grid.copy()), backend='csp', time_budget=5, workers=1,
+                         parallel_threshold=0) as solver:
+            assert solver.solve() == inline
+        to_clear, to_flag = inline
+        if to_clear:
+            engine.reveal(*to_clear[0])
+        elif to_flag:
+            engine.flag(*to_flag[0])
+        else:
+            safe = np.argwhere((engine.state == STATE_DEFAULT) & ~engine.mines)
+            engine.reveal(*safe[0])
+
+
+def test_pattern_cache_adds_to_the_rules(played_board):
+    for seed in range(6):
+        engine = played_board(16, 30, 99, seed, revealed=0.3)
+        rules = GraphSolver(MSGrid(grid=engine.revealed.copy())).solve()
+        cache = PatternCache()
+        cached = GraphSolver(MSGrid(grid=engine.revealed.copy()), pattern_cache=cache).solve()
+        # a second solver on the same grid gets every window from the table
+        hits = cache.hits
+        cached_again = GraphSolver(MSGrid(grid=engine.revealed.copy()), pattern_cache=cache).solve()
+        assert cache.hits > hits
+        assert cached_again == cached
+        for rules_cells, cached_cells in zip(rules, cached):
+            assert set(rules_cells) <= set(cached_cells)
+        assert not any(engine.mines[cell] for cell in cached[0])
+        assert all(engine.mines[cell] for cell in cached[1])
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('size, num_of_mines', [((9, 9), 10), ((16, 30), 99)])
+def test_updated_solver_matches_rebuilt(random_moves, seed, size, num_of_mines):
+    """the persistent solver, updated with the changed cells of every move (unflags included), finds the same moves
+    as a solver built from the grid. The flags are right, a wrong one can make the numbers contradict each other and
+    what the rules deduce from a contradiction depends on the order they run in.
+    """
+    engine = GameEngine(*size, num_of_mines, seed=seed)
+    grid = MSGrid(size_x=size[0], size_y=size[1])
+    solver = GraphSolver(grid)
+    for changed in random_moves(engine, 120, seed, wrong_flags=False):
+        solver.update(grid.update_cells((cell, engine.revealed[cell]) for cell in changed))
+        assert solver.solve() == GraphSolver(MSGrid(grid=engine.revealed.copy())).solve()
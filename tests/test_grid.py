@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from benchmark import boundary_flags_loop, make_board
+from engine import GameEngine
+from grid import MSGrid, cells_of, neighbour_table
+
+
+def agent_view(unknown: np.ndarray) -> np.ndarray:
+    return np.where(unknown, MSGrid.UKNOWN_CONSTANT, 0)
+
+
+@pytest.mark.parametrize('shape', [(16, 30), (9, 9), (1, 1), (1, 12), (12, 1), (2, 7), (7, 2)])
+@pytest.mark.parametrize('seed', range(5))
+def test_boundary_mask_random(shape, seed):
+    unknown = np.random.default_rng(seed).random(shape) < 0.5
+    flags = MSGrid.boundary_mask(unknown)
+    assert np.array_equal(flags, boundary_flags_loop(agent_view(unknown)).astype(bool))
+
+
+@pytest.mark.parametrize('size', [(9, 9), (16, 30), (30, 16)])
+def test_boundary_mask_board(size):
+    board = make_board(*size)
+    assert np.array_equal(MSGrid(grid=board).boundary_flags, boundary_flags_loop(board).astype(bool))
+
+
+@pytest.mark.parametrize('shape', [(1, 10), (10, 1), (5, 8)])
+@pytest.mark.parametrize('value', [True, False])
+def test_boundary_mask_uniform(shape, value):
+    # nothing to compare against on a fully known or fully unknown board, there is no boundary
+    unknown = np.full(shape, value)
+    assert not MSGrid.boundary_mask(unknown).any()
+    assert not boundary_flags_loop(agent_view(unknown)).any()
+
+
+def test_boundary_mask_stack():
+    unknown = np.random.default_rng(0).random((4, 6, 11)) < 0.3
+    stacked = MSGrid.boundary_mask(unknown)
+    for layer, flags in zip(unknown, stacked):
+        assert np.array_equal(flags, MSGrid.boundary_mask(layer))
+
+
+def neighbours_reference(size_x, size_y, x, y, radius_x, radius_y):
+    return [(x + dx, y + dy) for dx in range(-radius_x, radius_x + 1) for dy in range(-radius_y, radius_y + 1)
+            if (dx, dy) != (0, 0) and 0 <= x + dx < size_x and 0 <= y + dy < size_y]
+
+
+SHAPES_AND_RADII = [((1, 9), 1, 1), ((9, 1), 1, 1), ((1, 1), 1, 1), ((6, 7), 1, 1), ((6, 7), 2, 1), ((6, 7), 1, 3),
+                    ((4, 11), 0, 2), ((11, 4), 3, 0), ((2, 3), 2, 2)]
+
+
+@pytest.mark.parametrize('shape, radius_x, radius_y', SHAPES_AND_RADII)
+def test_neighbour_table(shape, radius_x, radius_y):
+    size_x, size_y = shape
+    table = neighbour_table(size_x, size_y, radius_x, radius_y)
+    assert table.shape == (size_x * size_y, (2 * radius_x + 1) * (2 * radius_y + 1) - 1)
+    for x in range(size_x):
+        for y in range(size_y):
+            row = table[x * size_y + y]
+            assert cells_of(row[row >= 0], size_y) == neighbours_reference(size_x, size_y, x, y, radius_x, radius_y)
+
+
+@pytest.mark.parametrize('shape, radius_x, radius_y', SHAPES_AND_RADII)
+def test_get_cell_neighbours(shape, radius_x, radius_y):
+    grid = MSGrid(size_x=shape[0], size_y=shape[1])
+    for x in range(shape[0]):
+        for y in range(shape[1]):
+            expected = neighbours_reference(*shape, x, y, radius_x, radius_y)
+            assert grid.get_cell_neighbours((x, y), radius_x=radius_x, radius_y=radius_y) == expected
+            if radius_x == radius_y:
+                assert grid.get_cell_neighbours((x, y), radius=radius_x) == expected
+
+
+def known_views():
+    rng = np.random.default_rng(3)
+    views = [agent_view(rng.random(shape) < 0.5) for shape in [(1, 9), (9, 1), (6, 7), (7, 6)] for _ in range(3)]
+    # a known cell in every corner and along the edges of an unknown board, and the other way around
+    unknown = np.ones((5, 6), dtype=bool)
+    unknown[[0, 0, -1, -1], [0, -1, 0, -1]] = False
+    unknown[2, 0] = unknown[0, 3] = False
+    views += [agent_view(unknown), agent_view(~unknown)]
+    views += [agent_view(np.zeros((4, 5), dtype=bool)), agent_view(np.ones((4, 5), dtype=bool))]
+    return views
+
+
+@pytest.mark.parametrize('view', known_views())
+def test_known_and_unknown_cells(view):
+    grid = MSGrid(grid=view.astype(float))
+    size_x, size_y = view.shape
+    unknown = view == MSGrid.UKNOWN_CONSTANT
+    cells = [(x, y) for x in range(size_x) for y in range(size_y)]
+    neighbours = {cell: neighbours_reference(size_x, size_y, *cell, 1, 1) for cell in cells}
+    assert grid.get_known_cells() == [cell for cell in cells if not unknown[cell]]
+    assert grid.get_unknown_cells() == [
+        cell for cell in cells if unknown[cell] and any(not unknown[n] for n in neighbours[cell])]
+    for cell in cells:
+        assert grid.cell_is_edge(cell) == any(unknown[n] != unknown[cell] for n in neighbours[cell])
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('size, num_of_mines', [((9, 9), 10), ((16, 30), 99), ((1, 30), 5)])
+def test_update_cells_matches_rebuilt_grid(random_moves, seed, size, num_of_mines):
+    engine = GameEngine(*size, num_of_mines, seed=seed)
+    grid = MSGrid(size_x=size[0], size_y=size[1])
+    for changed in random_moves(engine, 150, seed):
+        grid.update_cells((cell, engine.revealed[cell]) for cell in changed)
+        rebuilt = MSGrid(grid=engine.revealed.copy())
+        assert np.array_equal(grid.grid, engine.revealed)
+        assert np.array_equal(grid.boundary_flags, rebuilt.boundary_flags)
+        assert grid.unknown_frontier == rebuilt.unknown_frontier
@@ -0,0 +1,20 @@
+import pytest
+from csp_solver import CSPSolver
+from graph_solver import GraphSolver
+from grid import MSGrid
+from linear_solver import LinearSolver
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('size, num_of_mines', [((8, 8), 14), ((16, 30), 99)])
+def test_linear_deductions_are_csp_deductions(played_board, seed, size, num_of_mines):
+    engine = played_board(*size, num_of_mines, seed, revealed=0.2)
+    solver = GraphSolver(MSGrid(grid=engine.revealed.copy()))
+    for graph in solver.graphs:
+        # the LinearSolver is not complete, but whatever it finds the exact enumeration must find too
+        to_clear, to_flag = LinearSolver().solve_graph(graph)
+        solution = CSPSolver().solve_graph(graph)
+        assert set(to_clear) <= set(solution.safe_locations())
+        assert set(to_flag) <= set(solution.mine_locations())
+        assert not any(engine.mines[cell] for cell in to_clear)
+        assert all(engine.mines[cell] for cell in to_flag)
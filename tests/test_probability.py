@@ -0,0 +1,40 @@
+import itertools
+import numpy as np
+import pytest
+from graph_solver import GraphSolver
+from grid import MSGrid
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('size, num_of_mines', [((9, 9), 10), ((16, 30), 99)])
+def test_probabilities_sum_to_mine_count(played_board, seed, size, num_of_mines):
+    engine = played_board(*size, num_of_mines, seed, revealed=0.2)
+    solver = GraphSolver(MSGrid(grid=engine.revealed.copy()), backend='csp', time_budget=10)
+    probabilities = solver.mine_probabilities(num_of_mines)
+    # every component was enumerated, nothing was estimated
+    assert len(solver.solutions) == len(solver.graphs)
+    assert probabilities.sum() == pytest.approx(num_of_mines)
+    assert ((probabilities >= 0) & (probabilities <= 1 + 1e-9)).all()
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_probabilities_match_brute_force(played_board, seed):
+    num_of_mines = 7
+    engine = played_board(5, 6, num_of_mines, seed, revealed=0.3)
+    grid = MSGrid(grid=engine.revealed.copy())
+    unknown = [tuple(cell) for cell in np.argwhere(grid.grid == MSGrid.UKNOWN_CONSTANT)]
+    remaining = num_of_mines - int(np.count_nonzero(grid.grid == MSGrid.MINE))
+    numbers = [tuple(cell) for cell in np.argwhere(grid.grid >= 0)]
+    counts = np.zeros(grid.grid.shape)
+    total = 0
+    for mines in itertools.combinations(unknown, remaining):
+        board = grid.grid == MSGrid.MINE
+        for cell in mines:
+            board[cell] = True
+        if all(sum(board[neighbour] for neighbour in grid.get_cell_neighbours(cell)) == grid.grid[cell]
+               for cell in numbers):
+            counts += board
+            total += 1
+    assert total
+    probabilities = GraphSolver(grid, backend='csp', time_budget=10).mine_probabilities(num_of_mines)
+    assert np.allclose(probabilities, counts / total)
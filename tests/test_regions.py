@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from regions import label_components, label_regions
+
+EIGHT_CONNECTED = np.ones((3, 3), dtype=bool)
+
+
+def snake(size_x: int, size_y: int) -> np.ndarray:
+    """every other row, joined at alternating ends, a single region as long as the board"""
+    mask = np.zeros((size_x, size_y), dtype=bool)
+    mask[::2] = True
+    mask[1::4, -1] = True
+    mask[3::4, 0] = True
+    return mask
+
+
+def label_across_reference(mask: np.ndarray, across: np.ndarray) -> np.ndarray:
+    """breadth first search over the pairs of neighbours with one cell in across and the other one outside"""
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    size_x, size_y = mask.shape
+    n = 0
+    for start in zip(*np.nonzero(mask)):
+        if labels[start]:
+            continue
+        n += 1
+        labels[start] = n
+        queue = [start]
+        for x, y in queue:
+            for i in range(max(x - 1, 0), min(x + 2, size_x)):
+                for j in range(max(y - 1, 0), min(y + 2, size_y)):
+                    if mask[i, j] and not labels[i, j] and across[i, j] != across[x, y]:
+                        labels[i, j] = n
+                        queue.append((i, j))
+    return labels
+
+
+def masks():
+    rng = np.random.default_rng(0)
+    for density in (0.2, 0.45, 0.6):
+        yield rng.random((16, 30)) < density
+    yield rng.random((1, 40)) < 0.5
+    yield rng.random((40, 1)) < 0.5
+    yield np.zeros((5, 7), dtype=bool)
+    yield np.ones((5, 7), dtype=bool)
+    yield snake(31, 17)
+    # the same snake entered from its far end, the smallest root has to travel the whole length
+    yield snake(31, 17)[::-1, ::-1]
+    yield snake(17, 31).T
+
+
+@pytest.mark.parametrize('mask', list(masks()))
+def test_label_regions_matches_scipy(mask):
+    # scipy is not a dependency, only this comparison needs it
+    ndimage = pytest.importorskip('scipy.ndimage')
+    labels, n = label_regions(mask)
+    expected, expected_n = ndimage.label(mask, structure=EIGHT_CONNECTED)
+    assert n == expected_n
+    assert labels.dtype == np.int32
+    assert np.array_equal(labels, expected)
+
+
+@pytest.mark.parametrize('mask', list(masks()))
+def test_label_components(mask):
+    labels, regions = label_components(mask)
+    assert len(regions) == labels.max()
+    for i, cells in enumerate(regions):
+        assert np.array_equal(cells, np.flatnonzero(labels == i + 1))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_label_regions_across(seed):
+    rng = np.random.default_rng(seed)
+    mask = rng.random((12, 20)) < 0.6
+    across = rng.random((12, 20)) < 0.5
+    labels, n = label_regions(mask, across=across)
+    expected = label_across_reference(mask, across)
+    assert n == expected.max()
+    assert np.array_equal(labels, expected)
@@ -0,0 +1,47 @@
+import time
+import numpy as np
+from board import count_neighbour_mines
+from grid import MSGrid
+from solver_worker import SolverWorker
+
+
+def wait_for(worker: SolverWorker, timeout: float = 10):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise TimeoutError
+
+
+def test_no_guess_when_every_unknown_cell_is_flagged():
+    mines = np.zeros((5, 5), dtype=bool)
+    mines[0, 0] = mines[4, 4] = True
+    revealed = count_neighbour_mines(mines).astype(float)
+    # both mines flagged and a wrong flag on a safe cell, the game is not won and nothing is unknown
+    revealed[mines] = MSGrid.MINE
+    revealed[2, 2] = MSGrid.MINE
+    worker = SolverWorker()
+    worker.submit(1, revealed, 2)
+    result = wait_for(worker)
+    assert (result.to_clear, result.to_flag, result.guess) == ([], [], None)
+    worker.stop()
+    assert not worker.thread.is_alive()
+
+
+def test_guess_and_moves():
+    worker = SolverWorker()
+    revealed = np.full((9, 9), MSGrid.UKNOWN_CONSTANT, dtype=float)
+    worker.submit(1, revealed, 10)
+    result = wait_for(worker)
+    (x, y), probability = result.guess
+    assert 0 < probability < 1
+    # the only unknown neighbour of (0, 0) is a mine
+    revealed[0, 0] = 1
+    revealed[1, 0] = 1
+    revealed[1, 1] = 1
+    worker.submit(1, revealed, 10)
+    result = wait_for(worker)
+    assert (0, 1) in result.to_flag
+    worker.stop()